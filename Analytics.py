@@ -0,0 +1,161 @@
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:   # analytics need numpy
+    np = None
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()   # day ordinal -> numpy datetime64
+SHARDS_PER_PROCESS = 4
+POOL_MIN_MEMBERS = 250000   # "auto" only starts a process pool from this size
+
+
+def _months(ordinals):
+    # Day ordinals -> months since 1970-01
+    days = np.asarray(ordinals, dtype=np.int64) - EPOCH_ORDINAL
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+def _distinct(sorted_keys):
+    keep = np.ones(len(sorted_keys), dtype=bool)
+    keep[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    return sorted_keys[keep]
+
+
+def _month_name(month):
+    return f"{1970 + month // 12}-{month % 12 + 1:02d}"
+
+
+def member_rows(manager):
+    # One compact row per member: (plan_id, payment days, amounts, attendance
+    # days). Attendance logs are already arrays of day ordinals, so rows are
+    # cheap to build and to send to worker processes. They are copies, as
+    # check-ins may append to the logs once the lock is released.
+    rows = []
+    for member in manager.members.values():
+        payments = list(member.payment_log)
+        rows.append((member.workout_plan.plan_id if member.workout_plan else None,
+                     [day.toordinal() for day, _ in payments],
+                     [amount for _, amount in payments],
+                     member.attendance_days()[:]))
+    return rows
+
+
+def shard_totals(rows):
+    # Sums for one shard of members. Members never span shards, so the
+    # totals of several shards simply add up.
+    totals = {"members": len(rows), "revenue": Counter(), "plan_revenue": Counter(),
+              "visits": Counter(), "active": Counter(), "retained": Counter()}
+    if not rows:
+        return totals
+
+    # Payments: revenue per month and per plan
+    plan_ids = sorted({plan_id for plan_id, _, _, _ in rows if plan_id is not None})
+    plan_row = {plan_id: i for i, plan_id in enumerate(plan_ids)}
+    counts = np.array([len(days) for _, days, _, _ in rows])
+    if counts.sum():
+        days = np.concatenate([np.asarray(d, dtype=np.int64) for _, d, _, _ in rows])
+        amounts = np.concatenate([np.asarray(a, dtype=np.float64) for _, _, a, _ in rows])
+        months = _months(days)
+        first = months.min()
+        for offset, total in enumerate(np.bincount(months - first, weights=amounts)):
+            if total:
+                totals["revenue"][int(first + offset)] += float(total)
+        plans = np.repeat([plan_row.get(plan_id, len(plan_ids)) for plan_id, _, _, _ in rows], counts)
+        by_plan = np.bincount(plans, weights=amounts, minlength=len(plan_ids) + 1)
+        for plan_id, total in zip(plan_ids + [None], by_plan):
+            if total:
+                totals["plan_revenue"][plan_id] += float(total)
+
+    # Attendance: visits (distinct member-days), active and retained members per month
+    counts = np.array([len(days) for _, _, _, days in rows])
+    if counts.sum():
+        days = np.concatenate([np.asarray(d, dtype=np.int64) for _, _, _, d in rows])
+        members = np.repeat(np.arange(len(rows), dtype=np.int64), counts)
+        visits = _distinct(np.sort((members << 32) | days))
+        members, months = visits >> 32, _months(visits & 0xFFFFFFFF)
+        first = months.min()
+        for offset, n in enumerate(np.bincount(months - first)):
+            if n:
+                totals["visits"][int(first + offset)] += int(n)
+        # Active = member visited that month; retained = also visited the month before
+        # (sorted by member then day, so these keys come out sorted too)
+        active = _distinct(members * (1 << 20) + (months - first))
+        before = np.minimum(np.searchsorted(active, active - 1), len(active) - 1)
+        retained = active[active[before] == active - 1]
+        for key, series in (("active", active), ("retained", retained)):
+            for offset, n in enumerate(np.bincount(series % (1 << 20))):
+                if n:
+                    totals[key][int(first + offset)] += int(n)
+    return totals
+
+
+def _merge(parts):
+    totals = {"members": 0, "revenue": Counter(), "plan_revenue": Counter(),
+              "visits": Counter(), "active": Counter(), "retained": Counter()}
+    for part in parts:
+        totals["members"] += part["members"]
+        for key in ("revenue", "plan_revenue", "visits", "active", "retained"):
+            totals[key].update(part[key])
+    return totals
+
+
+def analytics_report(manager, processes="auto"):
+    # Monthly revenue, revenue per plan (by each member's current plan),
+    # visits per member and month-over-month retention. processes > 1 splits
+    # the members into shards and sums them in a process pool; "auto" does so
+    # with every CPU once the gym has POOL_MIN_MEMBERS members.
+    if np is None:
+        raise ImportError("Analytics need numpy (pip install numpy).")
+    with manager.lock.read():
+        rows = member_rows(manager)
+    if processes == "auto":
+        processes = os.cpu_count() if len(rows) >= POOL_MIN_MEMBERS else None
+    if processes and processes > 1 and len(rows) > 1:
+        size = -(-len(rows) // (processes * SHARDS_PER_PROCESS))
+        shards = [rows[i:i + size] for i in range(0, len(rows), size)]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            totals = _merge(pool.map(shard_totals, shards))
+    else:
+        totals = _merge([shard_totals(rows)])
+
+    revenue, visits = totals["revenue"], totals["visits"]
+    active, retained = totals["active"], totals["retained"]
+    months = sorted(set(revenue) | set(visits))
+    span = range(months[0], months[-1] + 1) if months else []
+    return {
+        "monthly_revenue": [(_month_name(m), revenue[m]) for m in span],
+        "revenue_per_plan": dict(totals["plan_revenue"].most_common()),
+        "average_visits": sum(visits.values()) / totals["members"] if totals["members"] else 0.0,
+        "monthly_visits": [(_month_name(m), visits[m], active[m],
+                            visits[m] / active[m] if active[m] else 0.0) for m in span],
+        "retention": [(_month_name(m), retained[m] / active[m - 1] if active[m - 1] else None)
+                      for m in span[1:]],
+    }
+
+
+def format_report(report):
+    lines = ["Month     Revenue (KES)   Visits  Active  Visits/active  Retention"]
+    retention = dict(report["retention"])
+    for (month, revenue), (_, visits, active, avg) in zip(report["monthly_revenue"],
+                                                          report["monthly_visits"]):
+        rate = retention.get(month)
+        lines.append(f"{month}  {revenue:13,.2f}  {visits:7d}  {active:6d}  {avg:13.2f}  "
+                     + (f"{rate:9.1%}" if rate is not None else "        -"))
+    lines.append(f"\nAverage visits per member: {report['average_visits']:.2f}")
+    lines.append("Revenue per plan:")
+    for plan_id, total in report["revenue_per_plan"].items():
+        lines.append(f"  {plan_id or 'No plan':<12} KES {total:,.2f}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # python Analytics.py [gym_data.json] [processes]
+    from Logic import GymManager
+    manager = GymManager()
+    manager.load_from_file(sys.argv[1] if len(sys.argv) > 1 else "gym_data.json")
+    print(format_report(analytics_report(manager, int(sys.argv[2]) if len(sys.argv) > 2 else "auto")))
@@ -0,0 +1,146 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from Logic import GymManager
+from Synthetic import generate_gym
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def _timed(fn, repeat=1):
+    # Best of `repeat` runs, in seconds
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def bench_size(size, workdir, repeat=3, years=1, visits_per_week=2):
+    results = {}
+    today = date.today()
+    week = [today - timedelta(i) for i in range(7)]
+    manager = generate_gym(size, years=years, visits_per_week=visits_per_week)
+    path = os.path.join(workdir, f"gym_{size}.json")
+
+    results["save_to_file"] = _timed(lambda: manager.save_to_file(path), repeat)
+    results["save_to_file_compact"] = _timed(
+        lambda: manager.save_to_file(path + ".compact", compact=True), repeat)
+    results["save_to_file_binary"] = _timed(
+        lambda: manager.save_to_file(path + ".bin", format="binary"), repeat)
+    # Only the first save into a directory writes every shard, so once
+    results["save_to_file_sharded"] = _timed(lambda: manager.save_to_file(path + ".shards"))
+    def save_one_change():
+        # Only the changed member's shard is rewritten
+        manager.log_attendance(today, next(iter(manager.members)))
+        manager.save_to_file(path + ".shards")
+    results["save_to_file_sharded_one_change"] = _timed(save_one_change, repeat)
+    results["file_bytes"] = os.path.getsize(path)
+    results["file_bytes_binary"] = os.path.getsize(path + ".bin")
+
+    loaded = []
+    def load(source):
+        fresh = GymManager()
+        fresh.load_from_file(source)
+        loaded[:] = [fresh]
+    results["load_from_file_binary"] = _timed(lambda: load(path + ".bin"), repeat)
+    results["load_from_file_sharded"] = _timed(lambda: load(path + ".shards"), repeat)
+    results["load_from_file"] = _timed(lambda: load(path), repeat)
+    manager = loaded[0]
+
+    results["get_unpaid_members"] = _timed(lambda: manager.get_unpaid_members(today.isoformat()), repeat)
+    results["get_summary_report"] = _timed(manager.get_summary_report, repeat)
+    def dashboard_cold():
+        manager._stats_cache.clear()
+        manager.dashboard_stats(today)
+    results["dashboard_stats_cold"] = _timed(dashboard_cold, repeat)
+    results["dashboard_stats_cached"] = _timed(lambda: manager.dashboard_stats(today), repeat)
+    results["attendance_week_chart"] = _timed(lambda: manager.attendance_counts(week), repeat)
+    results["top_attendees_week"] = _timed(lambda: manager.top_attendees(week, limit=5), repeat)
+    results["plan_counts"] = _timed(manager.plan_counts, repeat)
+    year = (today - timedelta(364), today)
+    results["heatmap_year"] = _timed(lambda: manager.attendance_heatmap(*year), repeat)
+    results["visited_5_of_90"] = _timed(lambda: manager.members_visited_at_least(5, 90, today), repeat)
+    # The first call writes the bitmap file, later ones reuse it
+    bitmap_path = path + ".attendance"
+    results["bitmap_build"] = _timed(lambda: manager.use_attendance_bitmap(bitmap_path))
+    results["bitmap_open"] = _timed(lambda: manager.use_attendance_bitmap(bitmap_path), repeat)
+    results["heatmap_year_bitmap"] = _timed(lambda: manager.attendance_heatmap(*year), repeat)
+    results["visited_5_of_90_bitmap"] = _timed(
+        lambda: manager.members_visited_at_least(5, 90, today), repeat)
+    # Destructive, so measured once and last
+    popular = manager.most_popular_plan()
+    results["remove_workoutplan"] = _timed(lambda: manager.remove_workoutplan(popular))
+    return results
+
+
+def compare(current, baseline):
+    # Prints new/old time ratios per size and operation; > 1 means slower
+    for size, ops in current["results"].items():
+        old_ops = baseline["results"].get(size)
+        if not old_ops:
+            continue
+        print(f"\n{size} members (vs {baseline.get('commit') or 'baseline'})")
+        for op, value in ops.items():
+            old = old_ops.get(op)
+            if old and not op.startswith("file_bytes"):
+                flag = "  <-- slower" if value > old * 1.2 else ""
+                print(f"  {op:<26} {value*1000:10.2f} ms  x{value/old:5.2f}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time GymManager operations on synthetic gyms.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs per operation")
+    parser.add_argument("--years", type=float, default=1, help="years of history per gym")
+    parser.add_argument("--visits-per-week", type=float, default=2)
+    parser.add_argument("--out", default="bench_results.json", help="where to write the results")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "params": {"repeat": args.repeat, "years": args.years,
+                   "visits_per_week": args.visits_per_week},
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            print(f"Benchmarking {size} members...", file=sys.stderr)
+            report["results"][str(size)] = bench_size(size, workdir, args.repeat,
+                                                      args.years, args.visits_per_week)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=4)
+
+    for size, ops in report["results"].items():
+        print(f"\n{size} members")
+        for op, value in ops.items():
+            print(f"  {op:<26} {value:>12}" if op.startswith("file_bytes") else f"  {op:<26} {value*1000:10.2f} ms")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+    print(f"\nResults written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import mmap
+import os
+import struct
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:   # the bitmap needs numpy
+    np = None
+
+BITMAP_MAGIC = b"PTGMBITS"
+BITMAP_VERSION = 1
+# magic, version, epoch (day ordinal of bit 0), days per row, rows used,
+# rows allocated, journal_seq and check-ins the bitmap is up to date with
+BITMAP_HEADER = struct.Struct("<8sHxxiIIIQQ")
+HEADER_BYTES = 64       # rows start here
+IDS_SUFFIX = ".ids"     # member ID of each row, one per line
+DAY_ALIGN = 64          # days per row are a multiple of this (8 bytes)
+MIN_ROWS = 1024
+ROW_CHUNK = 65536       # rows unpacked at a time for per-day counts
+
+
+def _days_for(epoch, last):
+    # Days per row from `epoch` through a year past `last`
+    return -(-(last + 366 - epoch) // DAY_ALIGN) * DAY_ALIGN
+
+
+class AttendanceBitmap:
+    # One bit per (member, day): row r belongs to the r-th member seen and
+    # bit d of it is day epoch + d. The file is memory-mapped, so opening it
+    # costs nothing however large it is, and visits over any range of days
+    # are popcounts over a slice of the matrix. Rows of removed members are
+    # zeroed, not reused by others.
+    def __init__(self, path, writable=True):
+        if np is None:
+            raise ImportError("AttendanceBitmap needs numpy (pip install numpy).")
+        self.path = path
+        self.writable = writable
+        with open(path + IDS_SUFFIX) as f:
+            self.member_ids = f.read().splitlines()
+        self.rows = {member_id: row for row, member_id in enumerate(self.member_ids)}
+        self._ids_file = open(path + IDS_SUFFIX, "a") if writable else None
+        self._map()
+
+    @classmethod
+    def build(cls, path, members, seq=0, today=None):
+        # New bitmap at `path` from (member_id, sorted day ordinals) pairs
+        members = [(member_id, np.asarray(days, dtype=np.int64)) for member_id, days in members]
+        today = (today or date.today()).toordinal()
+        first = min([today] + [int(days[0]) for _, days in members if len(days)])
+        epoch = date(date.fromordinal(first).year, 1, 1).toordinal()
+        last = max([today] + [int(days[-1]) for _, days in members if len(days)])
+        days_per_row = _days_for(epoch, last)
+        allocated = max(MIN_ROWS, len(members))
+        checkins = sum(len(days) for _, days in members)
+
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(BITMAP_HEADER.pack(BITMAP_MAGIC, BITMAP_VERSION, epoch, days_per_row,
+                                       len(members), allocated, seq, checkins).ljust(HEADER_BYTES, b"\0"))
+            f.truncate(HEADER_BYTES + allocated * days_per_row // 8)
+        bits = np.memmap(tmp, dtype=np.uint8, mode="r+", offset=HEADER_BYTES,
+                         shape=(allocated, days_per_row // 8))
+        # Set every bit in one pass: sorted, distinct bit numbers, OR-ed per
+        # byte (distinct bits of one byte add up to their OR). Sorted logs
+        # give sorted bit numbers, so repeat visits are neighbours.
+        counts = [len(days) for _, days in members]
+        if sum(counts):
+            rows = np.repeat(np.arange(len(members), dtype=np.int64), counts)
+            flat = rows * days_per_row + (np.concatenate([d for _, d in members]) - epoch)
+            if np.any(flat[1:] < flat[:-1]):
+                flat.sort()
+            flat = flat[np.r_[True, flat[1:] != flat[:-1]]]
+            byte = flat >> 3
+            starts = np.flatnonzero(np.r_[True, byte[1:] != byte[:-1]])
+            bits.reshape(-1)[byte[starts]] = np.add.reduceat(1 << (flat & 7), starts)
+        bits.flush()
+        del bits
+        with open(tmp + IDS_SUFFIX, "w") as f:
+            f.writelines(member_id + "\n" for member_id, _ in members)
+        os.replace(tmp + IDS_SUFFIX, path + IDS_SUFFIX)
+        os.replace(tmp, path)
+        return cls(path)
+
+    def _map(self):
+        with open(self.path, "r+b" if self.writable else "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if self.writable else mmap.ACCESS_READ)
+        (magic, version, self.epoch, self.days, used, self._allocated,
+         self.seq, self.checkins) = BITMAP_HEADER.unpack_from(self._mm)
+        if magic != BITMAP_MAGIC:
+            raise ValueError(f"{self.path} is not an attendance bitmap")
+        if version != BITMAP_VERSION:
+            raise ValueError(f"{self.path} is bitmap version {version}, expected {BITMAP_VERSION}")
+        if used != len(self.member_ids):
+            raise ValueError(f"{self.path} has {used} rows but {len(self.member_ids)} member IDs")
+        self.bits = np.frombuffer(self._mm, dtype=np.uint8, count=self._allocated * self.days // 8,
+                                  offset=HEADER_BYTES).reshape(self._allocated, self.days // 8)
+
+    def _write_header(self):
+        BITMAP_HEADER.pack_into(self._mm, 0, BITMAP_MAGIC, BITMAP_VERSION, self.epoch, self.days,
+                                len(self.member_ids), self._allocated, self.seq, self.checkins)
+
+    def close(self):
+        if self._ids_file is not None:
+            self._ids_file.close()
+            self._ids_file = None
+        self.bits = None
+        self._mm.close()
+
+    def flush(self):
+        self._mm.flush()
+
+    # --- Changes ---
+    def covers(self, ordinal):
+        return self.epoch <= ordinal < self.epoch + self.days
+
+    def _row(self, member_id):
+        row = self.rows.get(member_id)
+        if row is None:
+            if len(self.member_ids) == self._allocated:
+                self._grow()
+            row = self.rows[member_id] = len(self.member_ids)
+            self.member_ids.append(member_id)
+            self._ids_file.write(member_id + "\n")
+            self._ids_file.flush()
+        return row
+
+    def _grow(self):
+        # Double the rows; the views of the old mapping have to go first
+        self.bits = None
+        self._allocated *= 2
+        self._write_header()
+        self._mm.close()
+        with open(self.path, "r+b") as f:
+            f.truncate(HEADER_BYTES + self._allocated * self.days // 8)
+        self._map()
+
+    def add(self, member_id, ordinal, seq=None):
+        # ordinal must be covered (see covers()); check-ins count duplicates
+        bit = ordinal - self.epoch
+        self.bits[self._row(member_id), bit >> 3] |= 1 << (bit & 7)
+        self.checkins += 1
+        if seq is not None:
+            self.seq = seq
+        self._write_header()
+
+    def add_member(self, member_id, ordinals):
+        row = self._row(member_id)
+        for ordinal in ordinals:
+            bit = ordinal - self.epoch
+            self.bits[row, bit >> 3] |= 1 << (bit & 7)
+        self.checkins += len(ordinals)
+        self._write_header()
+
+    def remove_member(self, member_id, checkins):
+        # checkins: how many of the member's check-ins were counted
+        row = self.rows.get(member_id)
+        if row is not None:
+            self.bits[row] = 0
+            self.checkins -= checkins
+            self._write_header()
+
+    def note_seq(self, seq):
+        self.seq = seq
+        self._write_header()
+
+    # --- Queries ---
+    # Days are date objects or ordinals; ranges include both ends and are
+    # clipped to the days the bitmap covers.
+    def _span(self, start, end):
+        start = start if isinstance(start, int) else start.toordinal()
+        end = end if isinstance(end, int) else end.toordinal()
+        return max(start, self.epoch) - self.epoch, min(end, self.epoch + self.days - 1) - self.epoch
+
+    def visit_counts(self, start, end):
+        # Days visited in the range, per row
+        lo, hi = self._span(start, end)
+        used = len(self.member_ids)
+        if hi < lo or not used:
+            return np.zeros(used, dtype=np.int64)
+        block = self.bits[:used, lo >> 3:(hi >> 3) + 1].copy()
+        block[:, 0] &= (0xFF << (lo & 7)) & 0xFF
+        block[:, -1] &= 0xFF >> (7 - (hi & 7))
+        return np.bitwise_count(block).sum(axis=1, dtype=np.int64)
+
+    def visited_at_least(self, times, start, end):
+        # IDs of members who came on at least `times` days in the range
+        counts = self.visit_counts(start, end)
+        return [self.member_ids[row] for row in np.flatnonzero(counts >= max(times, 1))]
+
+    def daily_counts(self, start, end):
+        # Members present on each day of the range (a gym-wide heatmap row)
+        first = start if isinstance(start, int) else start.toordinal()
+        last = end if isinstance(end, int) else end.toordinal()
+        counts = np.zeros(max(last - first + 1, 0), dtype=np.int64)
+        lo, hi = self._span(first, last)
+        if hi < lo:
+            return counts
+        used = len(self.member_ids)
+        skip = lo & 7
+        for at in range(0, used, ROW_CHUNK):
+            block = self.bits[at:min(at + ROW_CHUNK, used), lo >> 3:(hi >> 3) + 1]
+            bits = np.unpackbits(block, axis=1, bitorder="little")[:, skip:skip + hi - lo + 1]
+            counts[lo + self.epoch - first:hi + self.epoch - first + 1] += bits.sum(axis=0, dtype=np.int64)
+        return counts
+
+    def member_days(self, member_id, start, end):
+        # True for each day of the range the member came in
+        first = start if isinstance(start, int) else start.toordinal()
+        last = end if isinstance(end, int) else end.toordinal()
+        days = np.zeros(max(last - first + 1, 0), dtype=bool)
+        row = self.rows.get(member_id)
+        lo, hi = self._span(first, last)
+        if row is None or hi < lo:
+            return days
+        bits = np.unpackbits(self.bits[row, lo >> 3:(hi >> 3) + 1], bitorder="little")
+        days[lo + self.epoch - first:hi + self.epoch - first + 1] = bits[lo & 7:(lo & 7) + hi - lo + 1]
+        return days
+
+
+if __name__ == "__main__":
+    # python Bitmap.py gym_data.attendance [days] [times]: who came at least
+    # `times` days out of the last `days`, straight from the bitmap file
+    import sys
+    from datetime import timedelta
+    bitmap = AttendanceBitmap(sys.argv[1], writable=False)
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 90
+    times = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    today = date.today()
+    regulars = bitmap.visited_at_least(times, today - timedelta(days=days - 1), today)
+    print(f"{len(regulars)} of {len(bitmap.member_ids)} members came on at least {times} "
+          f"of the last {days} days.")
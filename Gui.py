@@ -1,21 +1,25 @@
 # gui_app.py
+import time
+START = time.perf_counter()   # for --startup-time
 import os, json, calendar
+import threading
 from datetime import date, timedelta, datetime
 from pathlib import Path
 from PIL import Image
 import sys
-from io import BytesIO
 
 
 import customtkinter as ctk
 from customtkinter import CTkImage, CTkFont
 from CTkMessagebox import CTkMessagebox
-from Logic import GymManager, Member, WorkoutPlan
-from tkcalendar import DateEntry
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from Logic import GymManager, Member, WorkoutPlan, BackgroundSaver
+from Storage import open_manager
+from Analytics import analytics_report
+import Instrument
 from tkinter import ttk
 import tkinter as tk
+# matplotlib and tkcalendar are slow to import, so they are only imported
+# by the views that need them
 
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
@@ -30,34 +34,208 @@ def resource_path(relative_path):
 APP_WIDTH, APP_HEIGHT = 1200, 760
 ICON_DIR = resource_path("assets")
 DATA_FILE = "gym_data.json"
+DB_FILE = "gym_data.db"     # used instead of DATA_FILE once migrated
+SAVE_DELAY = 30.0           # the journal keeps each change; snapshots can wait
 BACKGROUND = "#e3f2fd"
 NAV_TEXT = "#0d47a1"
+# Startup budget in ms, checked by `python Gui.py --startup-time`:
+# window = empty window on screen, ready = data loaded and dashboard drawn
+STARTUP_BUDGET_MS = {"window": 1500, "ready": 5000}
 
 ctk.set_appearance_mode("light")
 ctk.set_default_color_theme("blue")
 
-# Backend
-manager = GymManager()
-if Path(DATA_FILE).exists():
-    manager.load_from_file()
+# Backend: opened by GymApp once its window is up (see _start_loading)
+manager = None
 
 # Icon loader
 def load_icon(name, sz=(32,32)):
     p = Path(ICON_DIR) / f"{name}.png"
     return CTkImage(Image.open(p), size=sz) if p.exists() else None
-icons = {
-    'dashboard_icon': load_icon('dashboard', sz=(24,24)),             # small nav icon
-    'dashboard_banner': load_icon('dashboard_banner', sz=(APP_WIDTH-40,180)),   
-    'members': load_icon('members'),
-    'workouts': load_icon('workouts'),
-    'attendance': load_icon('attendance'),
-    'payments': load_icon('payments'),
-    'save': load_icon('save'),
-    'exit': load_icon('exit'),
-    'paid': load_icon('paid'),
-    'unpaid': load_icon('unpaid'),
+
+ICON_FILES = {
+    'dashboard_icon': ('dashboard', (24,24)),             # small nav icon
+    'dashboard_banner': ('dashboard_banner', (APP_WIDTH-40,180)),
+    'members': ('members', (32,32)),
+    'workouts': ('workouts', (32,32)),
+    'attendance': ('attendance', (32,32)),
+    'payments': ('payments', (32,32)),
+    'save': ('save', (32,32)),
+    'exit': ('exit', (32,32)),
+    'paid': ('paid', (32,32)),
+    'unpaid': ('unpaid', (32,32)),
 }
 
+class _LazyIcons(dict):
+    # Each PNG is decoded the first time its icon is asked for
+    def __missing__(self, key):
+        name, sz = ICON_FILES[key]
+        icon = self[key] = load_icon(name, sz)
+        return icon
+
+    def get(self, key, default=None):
+        return self[key] if key in ICON_FILES else default
+
+icons = _LazyIcons()
+
+def date_entry(parent):
+    from tkcalendar import DateEntry
+    return DateEntry(parent, date_pattern="yyyy-MM-dd")
+
+class _VirtualRows:
+    """ Keeps only the visible window of a Treeview's rows materialized """
+    def __init__(self, tree, scrollbar, fetch, count):
+        self.tree, self.sb = tree, scrollbar
+        self.fetch, self.count = fetch, count
+        self.offset, self.visible = 0, int(tree.cget("height"))
+        self.row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        scrollbar.configure(command=self.on_scroll)
+        tree.bind("<Configure>", self.on_resize)
+        tree.bind("<MouseWheel>", lambda e: self.scroll_to(self.offset - int(e.delta/120)*3))
+        tree.bind("<Button-4>", lambda e: self.scroll_to(self.offset - 3))   # X11 wheel
+        tree.bind("<Button-5>", lambda e: self.scroll_to(self.offset + 3))
+        self.render()
+
+    def on_resize(self, event):
+        visible = max(1, (event.height - self.row_height) // self.row_height)
+        if visible != self.visible:
+            self.visible = visible
+            self.render()
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * self.count()))
+        elif unit == "pages":
+            self.scroll_to(self.offset + int(amount) * self.visible)
+        else:
+            self.scroll_to(self.offset + int(amount))
+
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, self.count() - self.visible))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+        return "break"
+
+    def render(self):
+        total = self.count()
+        self.offset = max(0, min(self.offset, total - self.visible))
+        self.tree.delete(*self.tree.get_children())
+        for row in self.fetch(self.offset, self.visible):
+            self.tree.insert("", "end", values=row)
+        if total:
+            self.sb.set(self.offset/total, min(1.0, (self.offset+self.visible)/total))
+        else:
+            self.sb.set(0, 1)
+
+
+class MemberPicker(ctk.CTkFrame):
+    """ Member ID entry whose suggestions are looked up as the user types """
+    def __init__(self, parent, limit=8, **kw):
+        super().__init__(parent, fg_color="transparent", **kw)
+        self.limit = limit
+        self.entry = ctk.CTkEntry(self, placeholder_text="Member ID or name")
+        self.entry.pack(fill="x", expand=True)
+        self.entry.bind("<KeyRelease>", self._suggest)
+        self.entry.bind("<Down>", lambda e: self._focus_list())
+        self.entry.bind("<Return>", self._accept_first)
+        self.entry.bind("<FocusOut>", lambda e: self.after(150, self._hide))
+        self.listbox = tk.Listbox(self.winfo_toplevel(), height=limit, activestyle="none")
+        self.listbox.bind("<<ListboxSelect>>", self._choose)
+        self.listbox.bind("<Return>", self._choose)
+        self._ids = []
+
+    def get(self):
+        return self.entry.get().strip()
+
+    def set(self, member_id):
+        self.entry.delete(0, "end")
+        self.entry.insert(0, member_id)
+
+    def _suggest(self, event):
+        if event.keysym in ("Down", "Return", "Escape"):
+            if event.keysym == "Escape":
+                self._hide()
+            return
+        matches = manager.search_members(self.get(), limit=self.limit)
+        self._ids = [m.member_id for m in matches]
+        self.listbox.delete(0, "end")
+        for m in matches:
+            self.listbox.insert("end", f"{m.member_id} — {m.name}")
+        if matches:
+            self.listbox.configure(height=len(matches))
+            self.listbox.place(in_=self.entry, relx=0, rely=1, relwidth=1)
+            self.listbox.lift()
+        else:
+            self._hide()
+
+    def _accept_first(self, event=None):
+        # Enter in the entry takes the best match
+        if self._ids and self.listbox.winfo_ismapped():
+            self.set(self._ids[0])
+        self._hide()
+
+    def _focus_list(self):
+        if self._ids:
+            self.listbox.focus_set()
+            self.listbox.selection_set(0)
+
+    def _choose(self, event=None):
+        sel = self.listbox.curselection()
+        if sel:
+            self.set(self._ids[sel[0]])
+        self._hide()
+
+    def _hide(self):
+        self.listbox.place_forget()
+
+    def destroy(self):
+        self.listbox.destroy()
+        super().destroy()
+
+
+class AttendanceChart(ctk.CTkFrame):
+    """ Dashboard attendance bars, built once and updated in place """
+    RANGES = {"7 days": 7, "30 days": 30, "90 days": 90}
+
+    def __init__(self, parent, on_range, **kw):
+        super().__init__(parent, fg_color="white", corner_radius=8, **kw)
+        # Imported here so matplotlib only loads once a chart is shown
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.range = ctk.CTkSegmentedButton(self, values=list(self.RANGES),
+                                            command=lambda v: on_range(self.RANGES[v]))
+        self.range.set("7 days")
+        self.range.pack(anchor="e", padx=10, pady=(8,0))
+        self.figure = Figure(figsize=(7,2))
+        self.ax = self.figure.add_subplot()
+        self.ax.grid(axis="y", linestyle="--", alpha=0.5)
+        self.ax.set_axisbelow(True)
+        self.canvas = FigureCanvasTkAgg(self.figure, self)
+        self.canvas.get_tk_widget().pack(fill="x", padx=5, pady=(0,5))
+        self.bars = None
+
+    def update_bars(self, chart):
+        # chart: [(date, count)] as in GymManager.dashboard_stats
+        counts = [cnt for _, cnt in chart]
+        if self.bars is None or len(self.bars) != len(chart):
+            # New range: swap the bar artists, the figure and canvas stay
+            if self.bars is not None:
+                self.bars.remove()
+            self.bars = self.ax.bar(range(len(chart)), counts, color="#2d7fff")
+            step = max(1, len(chart) // 7)
+            fmt = "%a" if len(chart) <= 7 else "%d %b"
+            ticks = list(range(len(chart) - 1, -1, -step))[::-1]
+            self.ax.set_xticks(ticks)
+            self.ax.set_xticklabels([chart[i][0].strftime(fmt) for i in ticks])
+            self.ax.set_xlim(-0.6, len(chart) - 0.4)
+        else:
+            for bar, cnt in zip(self.bars, counts):
+                bar.set_height(cnt)
+        self.ax.set_ylim(0, max(counts + [1]) * 1.15)
+        self.canvas.draw_idle()
+
+
 class GymApp(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -65,52 +243,137 @@ class GymApp(ctk.CTk):
         self.geometry(f"{APP_WIDTH}x{APP_HEIGHT}")
         self.configure(fg_color=BACKGROUND)
         self.report_callback_exception = lambda exc, val, tb: None
-
-        # Convert icons to Tkinter PhotoImage after root exists
-        self.tk_images = {}
-        for key in ['paid', 'unpaid']:
-            ctk_img = icons[key]
-            if ctk_img:
-                pil_img = ctk_img._light_image
-                buf = BytesIO()
-                pil_img.save(buf, format="PNG")
-                self.tk_images[key] = tk.PhotoImage(master=self, data=buf.getvalue())
-            else:
-                self.tk_images[key] = None
+        self.startup_ms = {}
+        self.chart = None        # AttendanceChart, made on the first dashboard visit
+        self.chart_days = 7
+        self.exit_when_ready = False   # set by --startup-time
 
         self._build_nav()
         self.main = ctk.CTkFrame(self, fg_color=BACKGROUND)
         self.main.pack(fill="both", expand=True)
-        self.show_dashboard()
         self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after_idle(self._mark_startup, "window")
+        self._start_loading()
+
+    # --- Startup ---
+    # The window comes up empty with a progress bar while the data loads
+    # on a worker thread; the tabs unlock once the manager is ready.
+    def _start_loading(self):
+        self.loading = ctk.CTkFrame(self.main, fg_color=BACKGROUND)
+        self.loading.pack(expand=True)
+        self.loading_label = ctk.CTkLabel(self.loading, text="Loading gym data…",
+                                          font=CTkFont("Arial", 14))
+        self.loading_label.pack(pady=10)
+        bar = ctk.CTkProgressBar(self.loading, mode="indeterminate", width=300)
+        bar.pack()
+        bar.start()
+        self._load_result = None
+        pending = GymManager()
+        threading.Thread(target=self._load_data, args=(pending,),
+                         name="gym-loader", daemon=True).start()
+        self._poll_loading(pending)
+
+    def _load_data(self, pending):
+        # Worker thread: touches only the new manager, never a widget. A
+        # database opens at once (members are read on demand); a snapshot
+        # fills `pending`, and each action then appends to its journal
+        try:
+            result = open_manager(DATA_FILE, DB_FILE, journal=True, manager=pending)
+            if result.storage is None:
+                try:
+                    result.use_attendance_store()    # columnar attendance, needs numpy
+                except ImportError:
+                    pass
+            self._load_result = result
+        except Exception as e:
+            self._load_result = e
+
+    def _poll_loading(self, pending):
+        result = self._load_result
+        if result is None:
+            self.loading_label.configure(text=f"Loading gym data… {len(pending.members):,} members")
+            self.after(100, self._poll_loading, pending)
+        elif isinstance(result, Exception):
+            self.loading_label.configure(text=f"Could not load {DATA_FILE}: {result}",
+                                         text_color="#d9534f")
+        else:
+            if result.storage is None:
+                BackgroundSaver(result, DATA_FILE, delay=SAVE_DELAY)   # snapshots are written off the UI thread
+            self._loaded(result)
+
+    def _loaded(self, loaded_manager):
+        global manager
+        manager = loaded_manager
+        for b in self.nav_buttons:
+            b.configure(state="normal")
+        self.show_dashboard()
+        self.after_idle(self._mark_startup, "ready")
+
+    def _mark_startup(self, stage):
+        self.startup_ms[stage] = (time.perf_counter() - START) * 1000
+        if stage == "ready" and self.exit_when_ready:
+            over = [s for s, ms in self.startup_ms.items() if ms > STARTUP_BUDGET_MS[s]]
+            for s, ms in self.startup_ms.items():
+                print(f"{s:<7} {ms:8.0f} ms  (budget {STARTUP_BUDGET_MS[s]} ms)")
+            if over:
+                print("Over budget: " + ", ".join(over))
+            self.on_close(status=1 if over else 0)
 
     def _build_nav(self):
         nav = ctk.CTkFrame(self, fg_color="white", height=50)
         nav.pack(fill="x")
-        for txt, cmd, key in [
+        buttons = [
             ("Dashboard", self.show_dashboard, 'dashboard_icon'),
             ("Members",   self.show_members,   'members'),
             ("Workouts",  self.show_workouts,  'workouts'),
             ("Attendance",self.show_attendance,'attendance'),
             ("Payments",  self.show_payments,  'payments'),
+            ("Analytics", self.show_analytics, 'analytics'),
             ("Save",      self._save_all,      'save'),
-            ("Exit",      self.destroy,        'exit'),
-        ]:
+            ("Exit",      self.on_close,       'exit'),
+        ]
+        if Instrument.ENABLED:
+            buttons.insert(5, ("Diagnostics", self.show_diagnostics, 'diagnostics'))
+        self.nav_buttons = []
+        for txt, cmd, key in buttons:
             b = ctk.CTkButton(
-                nav, text=txt, image=icons[key], compound="left",
+                nav, text=txt, image=icons.get(key), compound="left",
                 fg_color="transparent", hover_color="#bbdefb",
                 text_color=NAV_TEXT, font=CTkFont("Arial", 12, "bold"),
                 command=cmd
             )
             b.pack(side="left", padx=8, pady=5)
+            if txt != "Exit":
+                b.configure(state="disabled")   # until the data has loaded
+                self.nav_buttons.append(b)
+        self.save_status = ctk.CTkLabel(nav, text="", text_color="gray40",
+                                        font=CTkFont("Arial", 11))
+        self.save_status.pack(side="right", padx=12)
+        self._poll_save_status()
+
+    def _poll_save_status(self):
+        saver = manager.saver if manager is not None else None
+        if saver is not None:
+            # Pending changes are already in the journal, only not yet in a snapshot
+            text = {"pending": "Saved to journal", "saving": "Saving…",
+                    "saved": "All changes saved", "error": "Save failed"}[saver.state]
+            self.save_status.configure(text=text,
+                                       text_color="#d9534f" if saver.state == "error" else "gray40")
+        self.after(300, self._poll_save_status)
 
     def clear(self):
         for w in self.main.winfo_children():
-            w.destroy()
+            if w is self.chart:
+                w.pack_forget()   # reused by the next dashboard visit
+            else:
+                w.destroy()
 
     def _save_all(self):
-        manager.save_to_file(DATA_FILE)
-        CTkMessagebox(message="Data saved!")
+        # Saving happens in the background; the nav bar shows its progress
+        if manager.saver is not None:
+            manager.saver.request(now=True)
+        else:
+            manager.flush()
 
     def on_close_simple(self):
         self._save_all()
@@ -132,7 +395,7 @@ class GymApp(ctk.CTk):
         if banner:
             ctk.CTkLabel(self.main, image=banner, text="").pack(pady=(5,20))
 
-        stats = manager.get_summary_report()
+        stats = manager.dashboard_stats(chart_days=self.chart_days)
         y,m = date.today().year, date.today().month
         last = calendar.monthrange(y,m)[1]
         cutoff = f"{y}-{m:02d}-{last}"
@@ -140,21 +403,12 @@ class GymApp(ctk.CTk):
                      font=CTkFont("Arial", 14)).pack(pady=(0,10))
 
         # Stats cards
-        tally = {}
-        for mbr in manager.members.values():
-            pid = mbr.workout_plan.plan_id if mbr.workout_plan else None
-            if pid:
-                tally[pid] = tally.get(pid,0) + 1
-        popular = max(tally.keys(), key=lambda k: tally[k]) if tally else "N/A"
-        paid_month = sum(1 for mbr in manager.members.values()
-                         if mbr.payment_log and mbr.payment_log[-1][0].startswith(date.today().strftime("%Y-%m")))
-
         cards = [
             ("Members",        stats['total_members']),
-            ("Plans",          len(manager.workout_plans)),
-            ("Popular Plan",   popular),
+            ("Plans",          stats['plans']),
+            ("Popular Plan",   stats['popular_plan'] or "N/A"),
             ("Today Attend",   stats['active_today']),
-            ("Paid This Month",paid_month),
+            ("Paid This Month",stats['paid_this_month']),
             ("Overdue",        stats['unpaid_members']),
         ]
         grid = ctk.CTkFrame(self.main, fg_color=BACKGROUND)
@@ -169,15 +423,14 @@ class GymApp(ctk.CTk):
                          text_color="#2d7fff").pack(pady=(0,8))
 
         # Attendance chart
-        fig,ax = plt.subplots(figsize=(7,2))
-        days = [(date.today() - timedelta(i)).strftime("%a") for i in range(6,-1,-1)]
-        vals = [sum(1 for mbr in manager.members.values()
-                   if (date.today()-timedelta(i)).isoformat() in mbr.attendance_log)
-                for i in range(6,-1,-1)]
-        ax.bar(days, vals, color="#2d7fff")
-        ax.grid(axis="y", linestyle="--", alpha=0.5)
-        canvas = FigureCanvasTkAgg(fig, self.main)
-        canvas.get_tk_widget().pack(fill="x", padx=20, pady=(10,20))
+        if self.chart is None:
+            self.chart = AttendanceChart(self.main, on_range=self._set_chart_range)
+        self.chart.pack(fill="x", padx=20, pady=(10,20))
+        self.chart.update_bars(stats['chart'])
+
+    def _set_chart_range(self, days):
+        self.chart_days = days
+        self.chart.update_bars(manager.dashboard_stats(chart_days=days)['chart'])
 
     # --- MEMBERS TAB (FULL CRUD + Intuitive UI) ---
 
@@ -217,11 +470,9 @@ class GymApp(ctk.CTk):
             upd.grid_columnconfigure(c, weight=1, uniform="mgr")
 
         # Row 1: labels and controls
-        member_ids = list(manager.members.keys()) or [""]
-        self.sel_member = ctk.StringVar(value=member_ids[0])
         ctk.CTkLabel(upd, text="Member:").grid(row=1, column=0, sticky="e", padx=5)
-        ctk.CTkOptionMenu(upd, values=member_ids, variable=self.sel_member
-                         ).grid(row=1, column=1, sticky="we", padx=5)
+        self.sel_member = MemberPicker(upd)
+        self.sel_member.grid(row=1, column=1, sticky="we", padx=5)
 
         ctk.CTkButton(upd, text="🗑 Delete",
                       fg_color="#d9534f", command=self._delete_member
@@ -239,11 +490,11 @@ class GymApp(ctk.CTk):
 
         # ── Members Table ──
         cols = ("ID", "Name", "Age", "Plan")
-        tree = self._make_table(frm, cols)
-        for mbr in manager.members.values():
-            pid = mbr.workout_plan.plan_id if mbr.workout_plan else "N/A"
-            tree.insert("", "end",
-                        values=(mbr.member_id, mbr.name, mbr.age, pid))
+        def rows(offset, limit):
+            return [(mbr.member_id, mbr.name, mbr.age,
+                     mbr.workout_plan.plan_id if mbr.workout_plan else "N/A")
+                    for mbr in manager.member_page(offset, limit)]
+        self._make_table(frm, cols, fetch=rows, count=manager.member_count)
 
     def _register_member(self):
         mid = self.reg_entries["Member ID"].get().strip()
@@ -254,7 +505,6 @@ class GymApp(ctk.CTk):
                                  message="Please fill out all fields correctly.")
         msg = manager.register_member(Member(mid, name, int(age),
                                              date.today().isoformat()))
-        manager.save_to_file(DATA_FILE)
         CTkMessagebox(message=msg)
         self.show_members()
 
@@ -263,8 +513,7 @@ class GymApp(ctk.CTk):
         if not mid:
             return CTkMessagebox(title="Error", message="No member selected.")
         if mid in manager.members:
-            manager.members.pop(mid)
-            manager.save_to_file(DATA_FILE)
+            manager.remove_member(mid)
             CTkMessagebox(message=f"Member {mid} deleted.")
         self.show_members()
 
@@ -275,10 +524,11 @@ class GymApp(ctk.CTk):
             return CTkMessagebox(title="Error", message="No member selected.")
         # Unassign or assign
         if plan == "N/A":
-            manager.unassign_workoutplan(plan_id=None, member_id=mid)
+            mbr = manager.get_members_info(mid)
+            if mbr and mbr.workout_plan:
+                manager.unassign_workoutplan(plan_id=mbr.workout_plan.plan_id, member_id=mid)
         else:
             manager.assign_workoutplan(plan, mid)
-        manager.save_to_file(DATA_FILE)
         CTkMessagebox(
             message=f"Member {mid}'s plan updated to {plan}.")
         self.show_members()
@@ -308,9 +558,9 @@ class GymApp(ctk.CTk):
         # Table with Assigned count
         cols = ("ID","Name","Focus","Assigned")
         tree = self._make_table(frm, cols)
+        counts = manager.plan_counts()
         for p in manager.workout_plans.values():
-            cnt = sum(1 for m in manager.members.values()
-                      if m.workout_plan and m.workout_plan.plan_id == p.plan_id)
+            cnt = counts[p.plan_id]
             tree.insert("", "end", values=(p.plan_id, p.name, p.focus_area, cnt or "0"))
 
     def _create_plan(self):
@@ -321,19 +571,14 @@ class GymApp(ctk.CTk):
         if not(pid and nm and fc and ex):
             return CTkMessagebox(message="Invalid plan data")
         manager.add_workoutplan(WorkoutPlan(pid, nm, fc, ex))
-        manager.save_to_file(DATA_FILE)
         CTkMessagebox(message="Plan created!")
         self.show_workouts()
 
     def _delete_plan(self):
         pid = self.wf["Plan ID"].get().strip()
         if pid in manager.workout_plans:
-            # unassign from members
-            for m in manager.members.values():
-                if m.workout_plan and m.workout_plan.plan_id == pid:
-                    m.workout_plan = None
+            # also unassigns it from members
             manager.remove_workoutplan(pid)
-            manager.save_to_file(DATA_FILE)
             CTkMessagebox(message=f"Plan {pid} removed.")
         self.show_workouts()
 
@@ -345,29 +590,25 @@ class GymApp(ctk.CTk):
 
         row = ctk.CTkFrame(frm, fg_color="white", corner_radius=8)
         row.pack(fill="x", pady=5)
-        self.at_mid = ctk.CTkEntry(row, placeholder_text="Member ID")
+        self.at_mid = MemberPicker(row)
         self.at_mid.pack(side="left", fill="x", expand=True, padx=5)
-        self.at_date = DateEntry(row, date_pattern="yyyy-MM-dd")
+        self.at_date = date_entry(row)
         self.at_date.pack(side="left", padx=5)
         ctk.CTkButton(row, text="Log Attendance", fg_color="#2d7fff",
                       command=self._log_att).pack(side="left", padx=5)
 
         # Top attendees this week
         week = [(date.today()-timedelta(i)).isoformat() for i in range(7)]
-        ranked = sorted(manager.members.values(),
-                        key=lambda m: sum(d in m.attendance_log for d in week),
-                        reverse=True)[:5]
-        text = "Top This Week: " + ", ".join(f"{m.name} ({sum(d in m.attendance_log for d in week)})"
-                                            for m in ranked)
+        ranked = manager.top_attendees(week, limit=5)
+        text = "Top This Week: " + ", ".join(f"{m.name} ({cnt})" for m, cnt in ranked)
         ctk.CTkLabel(frm, text=text, wraplength=APP_WIDTH-40).pack(pady=10)
 
     def _log_att(self):
-        mid = self.at_mid.get().strip()
+        mid = self.at_mid.get()
         dt  = self.at_date.get_date().isoformat()
         if not mid:
             return CTkMessagebox(message="Enter Member ID")
         manager.log_attendance(dt, mid)
-        manager.save_to_file(DATA_FILE)
         CTkMessagebox(message="Attendance logged.")
 
     # --- Payments ---
@@ -380,11 +621,11 @@ class GymApp(ctk.CTk):
         prow = ctk.CTkFrame(frm, fg_color="white", corner_radius=8)
         prow.pack(fill="x", pady=5)
         # Payment form fields
-        self.pm_mid = ctk.CTkEntry(prow, placeholder_text="Member ID")
+        self.pm_mid = MemberPicker(prow)
         self.pm_mid.pack(side="left", padx=5, fill="x", expand=True)
         self.pm_amt = ctk.CTkEntry(prow, placeholder_text="Amount")
         self.pm_amt.pack(side="left", padx=5, fill="x", expand=True)
-        self.pm_date = DateEntry(prow, date_pattern="yyyy-MM-dd")
+        self.pm_date = date_entry(prow)
         self.pm_date.pack(side="left", padx=5)
         ctk.CTkButton(prow, text="Log Payment", fg_color="#2d7fff",
                       command=self._log_pay).pack(side="left", padx=5)
@@ -392,27 +633,115 @@ class GymApp(ctk.CTk):
 
     # Rebuild table without images:
         cols = ("ID","Name","Last Payment","Status")
-        tree = self._make_table(frm, cols)
-        for mbr in manager.members.values():
-            last = mbr.payment_log[-1][0] if mbr.payment_log else "None"
-            paid_this_month = last.startswith(date.today().strftime("%Y-%m"))
-            status = "Paid" if paid_this_month else "Overdue"
-            tree.insert("", "end",
-                        values=(mbr.member_id, mbr.name, last, status))
+        month = date.today().strftime("%Y-%m")
+        def rows(offset, limit):
+            page = []
+            for mbr in manager.member_page(offset, limit):
+                last = manager.last_payment_date(mbr.member_id)
+                status = "Paid" if last and last.strftime("%Y-%m") == month else "Overdue"
+                page.append((mbr.member_id, mbr.name, last or "None", status))
+            return page
+        self._make_table(frm, cols, fetch=rows, count=manager.member_count)
 
     def _log_pay(self):
-        mid = self.pm_mid.get().strip()
+        mid = self.pm_mid.get()
         amt = self.pm_amt.get().strip()
         dt  = self.pm_date.get_date().isoformat()
         if not(mid and amt.replace('.','',1).isdigit()):
             return CTkMessagebox(message="Invalid input")
-        manager.members[mid].add_payment(dt, float(amt))
-        manager.save_to_file(DATA_FILE)
+        manager.add_payment(dt, float(amt), mid)
         CTkMessagebox(message="Payment logged.")
         self.show_payments()
 
+    # --- Analytics ---
+    def show_analytics(self):
+        self.clear()
+        frm = ctk.CTkFrame(self.main, fg_color=BACKGROUND)
+        frm.pack(fill="both", expand=True, padx=20, pady=20)
+        label = ctk.CTkLabel(frm, text="Computing analytics…", font=CTkFont("Arial", 14))
+        label.pack(pady=10)
+        # Takes seconds on a large gym, so it runs on a worker thread (under
+        # the shared lock, check-ins carry on) and the result is polled for
+        result = []
+        def compute():
+            try:
+                result.append(analytics_report(manager))
+            except Exception as e:
+                result.append(e)
+        threading.Thread(target=compute, name="gym-analytics", daemon=True).start()
+        self._poll_analytics(frm, label, result)
+
+    def _poll_analytics(self, frm, label, result):
+        if not frm.winfo_exists():
+            return   # the user moved on to another view
+        if not result:
+            self.after(100, self._poll_analytics, frm, label, result)
+            return
+        label.destroy()
+        report = result[0]
+        if isinstance(report, Exception):
+            return CTkMessagebox(title="Error", message=str(report))
+
+        summary = f"Average visits per member: {report['average_visits']:.2f}     Revenue per plan: " + ", ".join(
+            f"{pid or 'No plan'} KES {total:,.0f}" for pid, total in report["revenue_per_plan"].items())
+        ctk.CTkLabel(frm, text=summary, wraplength=APP_WIDTH-40,
+                     font=CTkFont("Arial", 13)).pack(pady=(0,10))
+
+        cols = ("Month","Revenue (KES)","Visits","Active Members","Visits/Active","Retention")
+        tree = self._make_table(frm, cols)
+        retention = dict(report["retention"])
+        for (month, revenue), (_, visits, active, avg) in zip(report["monthly_revenue"],
+                                                              report["monthly_visits"]):
+            rate = retention.get(month)
+            tree.insert("", "0", values=(month, f"{revenue:,.2f}", visits, active, f"{avg:.2f}",
+                                         f"{rate:.1%}" if rate is not None else "-"))
+
+    # --- Diagnostics (only with PROTRACK_PROFILE=1) ---
+    def show_diagnostics(self):
+        self.clear()
+        frm = ctk.CTkFrame(self.main, fg_color=BACKGROUND)
+        frm.pack(fill="both", expand=True, padx=20, pady=20)
+
+        bar = ctk.CTkFrame(frm, fg_color="white", corner_radius=8)
+        bar.pack(fill="x", pady=5)
+        ctk.CTkButton(bar, text="Refresh", fg_color="#2d7fff",
+                      command=self.show_diagnostics).pack(side="left", padx=5, pady=5)
+        ctk.CTkButton(bar, text="Dump to File", fg_color="#2d7fff",
+                      command=lambda: CTkMessagebox(message=f"Saved to {Instrument.dump()}")
+                      ).pack(side="left", padx=5, pady=5)
+        self.prof_view = ctk.StringVar(value="show_dashboard")
+        ctk.CTkOptionMenu(bar, variable=self.prof_view,
+                          values=["show_dashboard", "show_members", "show_workouts",
+                                  "show_attendance", "show_payments", "show_analytics"]
+                         ).pack(side="right", padx=5, pady=5)
+        ctk.CTkButton(bar, text="Profile View", fg_color="#2d7fff",
+                      command=self._profile_view).pack(side="right", padx=5, pady=5)
+
+        cols = ("Operation", "Calls", "Total ms", "p50 ms", "p95 ms")
+        tree = self._make_table(frm, cols)
+        for row in Instrument.report():
+            tree.insert("", "end", values=(row["operation"], row["calls"],
+                                           f"{row['total_ms']:.1f}", f"{row['p50_ms']:.2f}",
+                                           f"{row['p95_ms']:.2f}"))
+
+    def _profile_view(self):
+        # Build the chosen view once under cProfile
+        view = self.prof_view.get()
+        path = f"protrack_{view}.prof"
+        summary = Instrument.profile_call(getattr(self, view), path)
+        win = ctk.CTkToplevel(self)
+        win.title(f"{view} profile")
+        win.geometry("900x500")
+        ctk.CTkLabel(win, text=f"Stats saved to {path}.").pack(anchor="w", padx=10, pady=(10, 0))
+        box = ctk.CTkTextbox(win, font=("Courier", 12), wrap="none")
+        box.pack(fill="both", expand=True, padx=10, pady=10)
+        box.insert("1.0", summary)
+        box.configure(state="disabled")
+
     # --- Utility Table ---
-    def _make_table(self, parent, cols):
+    def _make_table(self, parent, cols, fetch=None, count=None):
+        # With fetch(offset, limit) -> rows and count() -> total, only the
+        # visible rows exist in the Treeview and pages are fetched on scroll.
         frm = ctk.CTkFrame(parent, fg_color=BACKGROUND)
         frm.pack(fill="both", expand=True, padx=5, pady=5)
         tree = ttk.Treeview(frm, columns=cols, show="headings", height=8)
@@ -420,26 +749,35 @@ class GymApp(ctk.CTk):
             tree.heading(c, text=c)
             tree.column(c, anchor="center", width=int((APP_WIDTH-100)/len(cols)))
         sb = ttk.Scrollbar(frm, orient="vertical", command=tree.yview)
-        tree.configure(yscrollcommand=sb.set)
         tree.pack(side="left", fill="both", expand=True)
         sb.pack(side="right", fill="y")
+        if fetch is not None:
+            tree.virtual = _VirtualRows(tree, sb, fetch, count)
+        else:
+            tree.configure(yscrollcommand=sb.set)
         return tree
     
-    def on_close(self):
+    def on_close(self, status=0):
         # Manually destroy any DateEntry widgets to cancel their after‑jobs
         # Walk through all children and if it’s a DateEntry, destroy it before quitting
+        tkcalendar = sys.modules.get("tkcalendar")   # None: no DateEntry was ever made
         def _destroy_date_entries(widget):
             for child in widget.winfo_children():
-                if isinstance(child, DateEntry):
+                if isinstance(child, tkcalendar.DateEntry):
                     try:
                         child._top_cal.after_cancel(child._validate_after_id)
                     except Exception:
                         pass
                     child.destroy()
                 _destroy_date_entries(child)
-        _destroy_date_entries(self)
-        # Save everything before exit
-        manager.save_to_file(DATA_FILE)  # Directly save using the manager
+        if tkcalendar is not None:
+            _destroy_date_entries(self)
+        # Wait for a final snapshot that includes the journal before exit
+        if manager is not None:
+            manager.flush()
+            if manager.saver is not None:
+                manager.saver.stop()
+            manager.close_journal()
         # Stop the mainloop cleanly
         try:
             self.quit()
@@ -447,9 +785,17 @@ class GymApp(ctk.CTk):
             pass
         # Destroy the window and exit the process
         self.destroy()
-        sys.exit(0)
+        sys.exit(status)
+
+# Opt-in timing of view builds and saves (PROTRACK_PROFILE=1)
+Instrument.instrument_class(GymApp, names=["show_dashboard", "show_members", "show_workouts",
+                                           "show_attendance", "show_payments", "show_analytics",
+                                           "_save_all"])
 
 if __name__ == '__main__':
+    # --startup-time: print time to window and to a usable dashboard, then
+    # exit (status 1 when over STARTUP_BUDGET_MS)
     app = GymApp()
+    app.exit_when_ready = "--startup-time" in sys.argv
     app.mainloop()
     sys.exit(0)
\ No newline at end of file
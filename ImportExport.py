@@ -0,0 +1,95 @@
+import argparse
+import csv
+import sys
+
+from Logic import GymManager, snapshot_format
+from Storage import open_manager
+
+DATA_FILE = "gym_data.json"
+DB_FILE = "gym_data.db"
+
+# CSV columns for each kind of record, in file order
+FIELDS = {
+    "members": ("member_id", "name", "age", "join_date", "plan_id"),
+    "attendance": ("member_id", "date"),
+    "payments": ("member_id", "date", "amount"),
+}
+
+
+def import_csv(manager, kind, path):
+    # Rows are streamed straight from the file into the bulk methods
+    with open(path, newline="") as f:
+        rows = csv.DictReader(f)
+        if kind == "members":
+            return manager.bulk_register(rows)
+        if kind == "attendance":
+            return manager.bulk_log_attendance(rows)
+        return manager.bulk_add_payments(rows)
+
+
+def export_rows(manager, kind):
+    for member in manager.members.values():
+        if kind == "members":
+            plan_id = member.workout_plan.plan_id if member.workout_plan else ""
+            yield (member.member_id, member.name, member.age, member.join_date, plan_id)
+        elif kind == "attendance":
+            for day in member.attendance_log:
+                yield (member.member_id, day)
+        else:
+            for day, amount in member.payment_log:
+                yield (member.member_id, day, amount)
+
+
+def export_csv(manager, kind, out):
+    writer = csv.writer(out)
+    writer.writerow(FIELDS[kind])
+    writer.writerows(export_rows(manager, kind))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk CSV import/export for ProTrack GMS.")
+    parser.add_argument("--data", default=DATA_FILE, help="JSON data file (default: %(default)s)")
+    parser.add_argument("--db", default=DB_FILE, help="SQLite file, used instead when it exists")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="apply a CSV file in one batch")
+    imp.add_argument("kind", choices=FIELDS)
+    imp.add_argument("path")
+    exp = sub.add_parser("export", help="write records as CSV")
+    exp.add_argument("kind", choices=FIELDS)
+    exp.add_argument("path", nargs="?", default="-", help="output file, or - for stdout")
+    conv = sub.add_parser("convert", help="rewrite a snapshot as JSON, binary or shards")
+    conv.add_argument("source")
+    conv.add_argument("target", help="a .bin target is written in the binary format, "
+                                     "a .shards target as a sharded directory")
+    conv.add_argument("--shards", type=int, help="shard count for a sharded target (default 16)")
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        manager = GymManager()
+        manager.load_from_file(args.source)
+        manager.save_to_file(args.target, shards=args.shards)
+        print(f"Wrote {len(manager.members)} members to {args.target} ({snapshot_format(args.target)}).")
+        return 0
+
+    manager = open_manager(args.data, args.db)
+    if args.command == "export":
+        if args.path == "-":
+            export_csv(manager, args.kind, sys.stdout)
+        else:
+            with open(args.path, "w", newline="") as out:
+                export_csv(manager, args.kind, out)
+        return 0
+
+    result = import_csv(manager, args.kind, args.path)
+    if manager.storage is None:
+        manager.save_to_file(args.data)
+    for row_no, message in result["errors"]:
+        print(f"row {row_no}: {message}", file=sys.stderr)
+    if result["failed"] > len(result["errors"]):
+        print(f"... {result['failed'] - len(result['errors'])} more errors not shown", file=sys.stderr)
+    print(f"Imported {result['applied']} {args.kind} rows, {result['failed']} rejected.")
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import atexit
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import deque
+
+# Set PROTRACK_PROFILE=1 to time every GymManager method and GUI view.
+# When unset nothing is wrapped at all, so there is no overhead.
+ENABLED = os.environ.get("PROTRACK_PROFILE", "").lower() in ("1", "true", "yes", "on")
+DUMP_FILE = os.environ.get("PROTRACK_PROFILE_FILE", "protrack_profile.json")
+SAMPLES_KEPT = 2048   # latest calls per operation used for p50/p95
+
+_lock = threading.Lock()
+_stats = {}           # operation name -> [calls, total seconds, deque of samples]
+
+
+def record(name, seconds):
+    with _lock:
+        entry = _stats.get(name)
+        if entry is None:
+            entry = _stats[name] = [0, 0.0, deque(maxlen=SAMPLES_KEPT)]
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2].append(seconds)
+
+
+def timed(name):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def instrument_class(cls, names=None, skip=()):
+    # Wraps the public methods of `cls` (or just `names`) with timing.
+    # Does nothing unless instrumentation is enabled.
+    if not ENABLED:
+        return cls
+    if names is None:
+        names = [n for n, v in vars(cls).items()
+                 if callable(v) and not n.startswith("_") and not isinstance(v, (staticmethod, classmethod))]
+    for name in names:
+        if name not in skip:
+            setattr(cls, name, timed(f"{cls.__name__}.{name}")(getattr(cls, name)))
+    return cls
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def report():
+    # One row per operation, slowest total first
+    with _lock:
+        entries = [(name, calls, total, sorted(samples))
+                   for name, (calls, total, samples) in _stats.items()]
+    rows = [{
+        "operation": name,
+        "calls": calls,
+        "total_ms": total * 1000,
+        "mean_ms": total * 1000 / calls,
+        "p50_ms": _percentile(samples, 0.50) * 1000,
+        "p95_ms": _percentile(samples, 0.95) * 1000,
+    } for name, calls, total, samples in entries]
+    return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def dump(path=None):
+    path = path or DUMP_FILE
+    with open(path, "w") as f:
+        json.dump({"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "operations": report()}, f, indent=4)
+    return path
+
+
+def profile_call(fn, path, *args, **kwargs):
+    # Runs fn once under cProfile, writes the raw stats to `path` (for
+    # snakeviz/pstats) and returns a short text summary of the hot spots
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+    profiler.dump_stats(path)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(15)
+    return out.getvalue()
+
+
+if ENABLED:
+    atexit.register(lambda: _stats and dump())
@@ -1,59 +1,412 @@
 from typing import List
+import functools
+import gc
 import json
-from datetime import date
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+import Instrument
+from Bitmap import AttendanceBitmap
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from itertools import accumulate, repeat
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import date, timedelta
+from operator import attrgetter, itemgetter
+
+try:
+    import numpy as np
+except ImportError:   # only needed for AttendanceStore
+    np = None
+
+JOURNAL_SUFFIX = ".journal"
+# Which parts of the data each recorded change touches, for the stats cache
+CHANGE_PARTS = {
+    "register": ("members", "plans", "attendance", "payments"),
+    "remove_member": ("members", "plans", "attendance", "payments"),
+    "add_plan": ("plans",),
+    "remove_plan": ("plans",),
+    "assign": ("plans",),
+    "unassign": ("plans",),
+    "attend": ("attendance",),
+    "pay": ("payments",),
+}
+JOURNAL_COMPACT_BYTES = 1024 * 1024   # fold the journal into a snapshot past 1 MB
+MAX_BULK_ERRORS = 1000                # row errors kept in a bulk result
+
+def journal_path(filename):
+    return filename + JOURNAL_SUFFIX
+
+def _journal_records(path):
+    # Yields (record, byte offset just past it) for each whole record,
+    # stopping at a torn final line from an interrupted write
+    with open(path, "rb") as f:
+        end = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                return
+            try:
+                record = json.loads(line)
+            except ValueError:
+                return
+            end += len(line)
+            yield record, end
+
+# Dates are datetime.date (or day ordinals in attendance logs) everywhere
+# inside; ISO strings only appear in files, the journal and the database.
+@functools.lru_cache(maxsize=8192)
+def _parse_date(text):
+    return date.fromisoformat(text)
+
+def _as_date(day):
+    # Each distinct ISO string is parsed once and its date object shared
+    return _parse_date(day) if isinstance(day, str) else day
+
+def _iso(day):
+    return day if isinstance(day, str) else day.isoformat()
+
+@functools.lru_cache(maxsize=8192)
+def _ordinal_iso(day):
+    return date.fromordinal(day).isoformat()
+
+@functools.lru_cache(maxsize=8192)
+def _ordinal_date(day):
+    return date.fromordinal(day)
+
+@functools.lru_cache(maxsize=8192)
+def _iso_ordinal(text):
+    return date.fromisoformat(text).toordinal()
+
+def _ordinal(day):
+    if isinstance(day, int):
+        return day
+    return _iso_ordinal(day) if isinstance(day, str) else day.toordinal()
+
+def _legacy_dates(member_id, what, values):
+    # Parses a member's dates one by one: None for each that is not
+    # YYYY-MM-DD, which is reported on stderr
+    dates, bad = [], []
+    for value in values:
+        try:
+            dates.append(_as_date(value))
+        except (TypeError, ValueError):
+            dates.append(None)
+            bad.append(value)
+    if bad:
+        print(f"Warning: member {member_id}: left out {len(bad)} {what}(s) dated other "
+              f"than YYYY-MM-DD: {', '.join(map(repr, bad))}", file=sys.stderr)
+    return dates
+
+def _clean_text(value):
+    # A cell as stripped text: JSON imports can hold numbers or null
+    return "" if value is None else str(value).strip()
+
+def _clean_date(value):
+    try:
+        return _as_date(str(value).strip())
+    except ValueError:
+        raise ValueError(f"invalid date {value!r}, expected YYYY-MM-DD") from None
+
+def _search_keys(member_id, name):
+    # (list, key) pairs a member can be found under, lists in rank order:
+    # 0 = member ID, 1 = full name, 2 = the name from a later word on
+    words = name.lower().split()
+    keys = [(0, member_id.lower()), (1, " ".join(words))]
+    keys.extend((2, " ".join(words[i:])) for i in range(1, len(words)))
+    return keys
+
+class RWLock:
+    # Many readers or one writer. `with lock:` is the exclusive (writer)
+    # side, `with lock.read():` the shared side. Both are reentrant, and the
+    # writer may also read; a reader can not turn into a writer. Waiting
+    # writers hold off new readers so a stream of readers can't starve them.
+    # shared=False makes read() exclusive too.
+    def __init__(self, shared=True):
+        self.shared = shared
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = {}        # thread id -> read depth
+        self._writer = None       # thread id of the writer
+        self._write_depth = 0
+        self._writers_waiting = 0
+        self._read_side = _ReadSide(self)
+
+    def acquire(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return True
+            if me in self._readers:
+                raise RuntimeError("a reader can not take the write lock")
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer, self._write_depth = me, 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self._write_depth -= 1
+            if not self._write_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+    def acquire_read(self):
+        if not self.shared:
+            return self.acquire()
+        me = threading.get_ident()
+        depth = self._readers.get(me)
+        if depth:
+            # Only this thread touches its own entry, so nesting needs no lock
+            self._readers[me] = depth + 1
+            return True
+        with self._cond:
+            if self._writer != me:
+                while self._writer is not None or self._writers_waiting:
+                    self._cond.wait()
+            self._readers[me] = 1
+            return True
+
+    def release_read(self):
+        if not self.shared:
+            return self.release()
+        me = threading.get_ident()
+        depth = self._readers[me]
+        if depth > 1:
+            self._readers[me] = depth - 1
+            return
+        with self._cond:
+            del self._readers[me]
+            if not self._readers:
+                self._cond.notify_all()
+
+    def held(self):
+        # Whether the calling thread holds either side
+        me = threading.get_ident()
+        return self._writer == me or me in self._readers
+
+    def read(self):
+        return self._read_side
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class _ReadSide:
+    # `with lock.read():`
+    __slots__ = ("lock",)
+
+    def __init__(self, lock):
+        self.lock = lock
+
+    def __enter__(self):
+        return self.lock.acquire_read()
+
+    def __exit__(self, *exc):
+        self.lock.release_read()
+
+
+# GymManager locking, always taken in this order:
+#   lock (RWLock)   exclusive for changes to the registry (members, plans,
+#                   plan assignments), loads and snapshot copies; shared
+#                   for reads and for log appends
+#   member locks    one of MEMBER_LOCK_STRIPES per member ID, around a
+#                   member's log being changed or read in several steps
+#   _state_lock     briefly, around the indexes, caches and journal that
+#                   every change updates
+# An append changes the member's log under its member lock alone, so appends
+# to different members run side by side; only the index and journal update
+# after it takes _state_lock, one append at a time, so the journal keeps one
+# order.
+MEMBER_LOCK_STRIPES = 64
+
+def _locked(method):
+    # Runs a GymManager method holding its lock exclusively
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            result = method(self, *args, **kwargs)
+        self._compact_if_due()
+        return result
+    return wrapper
+
+def _shared(method):
+    # Runs a GymManager method holding its lock shared
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.read():
+            result = method(self, *args, **kwargs)
+        self._compact_if_due()
+        return result
+    return wrapper
+
+def _indexed(method):
+    # Shared, plus the state lock: for reads of the indexes log appends update
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.read(), self._state_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+# One payment: a datetime.date and an amount
+Payment = namedtuple("Payment", "date amount")
+_payment_date = attrgetter("date")
+
 
 class Member:
+    # Both logs are kept sorted by date, whatever order entries arrive in,
+    # so date ranges are two bisects and the last payment is the latest.
+    __slots__ = ("member_id", "name", "age", "join_date", "workout_plan",
+                 "attendance_store", "_attendance_log", "_payment_log")
+
     def __init__(self,member_id,name,age,join_date):
         self.member_id = member_id
         self.name = name
         self.age = age
-        self.join_date = join_date
+        self.join_date = _as_date(join_date)
         self.workout_plan = None
-        self.attendance_log = []
-        self.payment_log = []
+        self.attendance_store = None   # AttendanceStore holding the log, if any
+        self._attendance_log = array("i")   # sorted day ordinals, 4 bytes per visit
+        self._payment_log = []              # Payment records, sorted by date
+
+    @property
+    def attendance_log(self):
+        # A read-only copy, so a stray append fails instead of being lost;
+        # log check-ins with attendance()
+        return tuple(map(date.fromordinal, self.attendance_days()))
+
+    @attendance_log.setter
+    def attendance_log(self, log):
+        if self.attendance_store is not None:
+            self.attendance_store.remove_member(self.member_id)
+            self.attendance_store.extend(self.member_id, log)
+        else:
+            self._attendance_log = array("i", sorted(map(_ordinal, log)))
+
+    @property
+    def payment_log(self):
+        # Read-only view in practice: add entries with add_payment
+        return self._payment_log
+
+    @payment_log.setter
+    def payment_log(self, log):
+        self._payment_log = sorted(log, key=_payment_date)
+
+    def attendance_days(self):
+        # The log as day ordinals, without building date objects
+        if self.attendance_store is not None:
+            return self.attendance_store.ordinals_for(self.member_id)
+        return self._attendance_log
+
+    def copy(self):
+        # Detached copy with its own logs, to serialize outside the lock
+        twin = Member(self.member_id, self.name, self.age, self.join_date)
+        twin.workout_plan = self.workout_plan
+        twin._attendance_log = array("i", self.attendance_days())
+        twin._payment_log = list(self._payment_log)
+        return twin
+
+    def attach_attendance_store(self, store):
+        store.extend(self.member_id, self._attendance_log)
+        self._attendance_log = array("i")
+        self.attendance_store = store
+
+    def detach_attendance_store(self):
+        self._attendance_log = array("i", self.attendance_days())
+        self.attendance_store = None
 
     def assign_plan(self, workout_plan):
         self.workout_plan = workout_plan
         return f'{workout_plan} has been successfully assigned.'
     
     def attendance(self, date):
-        self.attendance_log.append(date)
+        if self.attendance_store is not None:
+            self.attendance_store.add(self.member_id, date)
+        else:
+            insort(self._attendance_log, _ordinal(date))
         return f'{date} has been successfully logged.'
 
     def add_payment(self, date, amount):
-        self.payment_log.append((date, amount))
+        insort(self._payment_log, Payment(_as_date(date), amount), key=_payment_date)
         return f'Payment made on: {date} has been successfully logged.'
+
+    def attendance_between(self, start, end):
+        # Dates attended from start to end, both included
+        days = self.attendance_days()
+        lo = bisect_left(days, _ordinal(start))
+        hi = bisect_right(days, _ordinal(end))
+        return [date.fromordinal(day) for day in days[lo:hi]]
+
+    def payments_between(self, start, end):
+        # Payments made from start to end, both included
+        lo = bisect_left(self._payment_log, _as_date(start), key=_payment_date)
+        hi = bisect_right(self._payment_log, _as_date(end), key=_payment_date)
+        return self._payment_log[lo:hi]
+
+    def last_payment(self):
+        return self._payment_log[-1] if self._payment_log else None
     
     def get_payment_history(self):
-        if not self.payment_log:
+        last = self.last_payment()
+        if last is None:
             return "No payments made"
-        return f"Last payment: KES {self.payment_log[-1][0]} on {self.payment_log[-1][1]}"
+        return f"Last payment: KES {last.amount} on {last.date}"
     
     def get_attendance(self):
-        return f'{list(self.attendance_log)}'
+        return f'{[day.isoformat() for day in self.attendance_log]}'
     
     def to_dict(self):
         return {
             "member_id": self.member_id,
             "name": self.name,
             "age": self.age,
-            "join_date": self.join_date,
+            "join_date": self.join_date.isoformat(),
             "workout_plan_id": self.workout_plan.plan_id if self.workout_plan else None,
-            "payment_history": self.payment_log,
-            "attendance_log": self.attendance_log
+            "payment_history": [(day.isoformat(), amount) for day, amount in self.payment_log],
+            "attendance_log": [_ordinal_iso(day) for day in self.attendance_days()]
         }
 
     @classmethod
     def from_dict(cls, data, workout_plans):
-        member = cls(data["member_id"], data["name"], data["age"], data["join_date"])
-        member.payment_log = data["payment_history"]  # also fix key name here
-        member.attendance_log = data["attendance_log"]
+        # Files saved before dates were checked can hold hand-typed ones
+        # such as "18/10/2025". Those are left out with a warning instead of
+        # failing the whole load (see _legacy_dates).
+        member_id = data["member_id"]
+        try:
+            member = cls(member_id, data["name"], data["age"], data["join_date"])
+        except ValueError:
+            print(f"Warning: member {member_id}: join date {data['join_date']!r} is not in "
+                  f"YYYY-MM-DD form, using today", file=sys.stderr)
+            member = cls(member_id, data["name"], data["age"], date.today())
+        try:
+            member.payment_log = [Payment(_as_date(day), amount) for day, amount in data["payment_history"]]
+        except ValueError:
+            dates = _legacy_dates(member_id, "payment", [day for day, _ in data["payment_history"]])
+            member.payment_log = [Payment(day, amount) for day, (_, amount)
+                                  in zip(dates, data["payment_history"]) if day is not None]
+        try:
+            member.attendance_log = data["attendance_log"]
+        except ValueError:
+            dates = _legacy_dates(member_id, "check-in", data["attendance_log"])
+            member.attendance_log = [day for day in dates if day is not None]
         if data["workout_plan_id"]:
             member.workout_plan = workout_plans.get(data["workout_plan_id"])
         return member
 
 
 class WorkoutPlan:
+    __slots__ = ("plan_id", "name", "focus_area", "exercises")
+
     def __init__(self, plan_id,name,focus_area,exercises):
         self.plan_id = plan_id
         self.name = name
@@ -76,21 +429,556 @@ class WorkoutPlan:
          return cls(data["plan_id"], data["name"], data["focus_area"], data["exercises"])
 
 
-class GymManager:
+def _store_locked(method):
+    # Queries merge the pending check-ins, so every AttendanceStore method
+    # that reads or changes it takes the store's own lock
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+class AttendanceStore:
+    # Columnar attendance for every member: parallel int32 arrays of
+    # (member row, day ordinal) kept sorted by day then member, about 8 bytes
+    # per check-in. New check-ins are buffered and merged on the next query.
     def __init__(self):
+        if np is None:
+            raise ImportError("AttendanceStore needs numpy (pip install numpy).")
+        self._lock = threading.Lock()
+        self._rows = {}          # member_id -> row number
+        self._member_ids = []    # row number -> member_id
+        self._members = np.empty(0, dtype=np.int32)
+        self._days = np.empty(0, dtype=np.int32)
+        self._pending = []       # (row, day ordinals) not merged yet
+        self._pending_count = 0
+        self._by_member = None   # permutation sorting entries by member, cached
+
+    @_store_locked
+    def __len__(self):
+        return len(self._days) + self._pending_count
+
+    def _row(self, member_id):
+        row = self._rows.get(member_id)
+        if row is None:
+            row = self._rows[member_id] = len(self._member_ids)
+            self._member_ids.append(member_id)
+        return row
+
+    @_store_locked
+    def add(self, member_id, day):
+        self._pending.append((self._row(member_id), (_ordinal(day),)))
+        self._pending_count += 1
+
+    @_store_locked
+    def extend(self, member_id, days):
+        # Whole logs are kept as one chunk; an array("i") of ordinals is
+        # merged without looking at each day in Python
+        if not isinstance(days, array):
+            days = [_ordinal(day) for day in days]
+        if len(days):
+            self._pending.append((self._row(member_id), days))
+            self._pending_count += len(days)
+
+    @_store_locked
+    def remove_member(self, member_id):
+        row = self._rows.pop(member_id, None)
+        if row is None:
+            return
+        self._merge()
+        keep = self._members != row
+        self._members = self._members[keep]
+        self._days = self._days[keep]
+        self._member_ids[row] = None
+        self._by_member = None
+
+    def _merge(self):
+        if not self._pending:
+            return
+        rows = np.repeat(np.array([row for row, _ in self._pending], dtype=np.int64),
+                         [len(days) for _, days in self._pending])
+        days = np.concatenate([np.asarray(days, dtype=np.int64) for _, days in self._pending])
+        self._pending, self._pending_count = [], 0
+        order = np.lexsort((rows, days))
+        rows, days = rows[order], days[order]
+        keys = (self._days.astype(np.int64) << 32) | self._members
+        at = np.searchsorted(keys, (days << 32) | rows, side="right")
+        self._members = np.insert(self._members, at, rows.astype(np.int32))
+        self._days = np.insert(self._days, at, days.astype(np.int32))
+        self._by_member = None
+
+    def _day_slice(self, start, end):
+        # Index range of entries with start <= day <= end (ordinals)
+        self._merge()
+        return (np.searchsorted(self._days, start, side="left"),
+                np.searchsorted(self._days, end, side="right"))
+
+    def _distinct(self, lo, hi):
+        # Entries in [lo, hi) with repeat (member, day) check-ins dropped
+        members, days = self._members[lo:hi], self._days[lo:hi]
+        first = np.ones(len(days), dtype=bool)
+        first[1:] = (members[1:] != members[:-1]) | (days[1:] != days[:-1])
+        return members[first], days[first]
+
+    @_store_locked
+    def ordinals_for(self, member_id):
+        row = self._rows.get(member_id)
+        if row is None:
+            return []
+        self._merge()
+        if self._by_member is None:
+            self._by_member = np.argsort(self._members, kind="stable")
+            self._sorted_members = self._members[self._by_member]
+        lo = np.searchsorted(self._sorted_members, row, side="left")
+        hi = np.searchsorted(self._sorted_members, row, side="right")
+        return self._days[self._by_member[lo:hi]].tolist()
+
+    def dates_for(self, member_id):
+        return [date.fromordinal(day) for day in self.ordinals_for(member_id)]
+
+    @_store_locked
+    def entries_between(self, start, end):
+        # (member_id, day ordinal) for every check-in from start to end, by day
+        lo, hi = self._day_slice(_ordinal(start), _ordinal(end))
+        return [(self._member_ids[row], day)
+                for row, day in zip(self._members[lo:hi].tolist(), self._days[lo:hi].tolist())]
+
+    @_store_locked
+    def count_on(self, day):
+        day = _ordinal(day)
+        lo, hi = self._day_slice(day, day)
+        return int(np.unique(self._members[lo:hi]).size)
+
+    @_store_locked
+    def members_on(self, day):
+        day = _ordinal(day)
+        lo, hi = self._day_slice(day, day)
+        return {self._member_ids[row] for row in np.unique(self._members[lo:hi])}
+
+    @_store_locked
+    def counts_per_day(self, start, end):
+        # Distinct members per day for every day from start to end inclusive
+        start, end = _ordinal(start), _ordinal(end)
+        _, days = self._distinct(*self._day_slice(start, end))
+        return np.bincount(days - start, minlength=end - start + 1)
+
+    @_store_locked
+    def counts_per_member(self, start, end):
+        # Days attended per member between start and end inclusive
+        members, _ = self._distinct(*self._day_slice(_ordinal(start), _ordinal(end)))
+        counts = np.bincount(members, minlength=len(self._member_ids))
+        return {self._member_ids[row]: int(counts[row]) for row in np.flatnonzero(counts)}
+
+
+# --- Streaming JSON ---
+# Snapshots are written and read one plan/member at a time so that neither
+# save_to_file nor load_from_file holds the whole document in memory. The
+# indented output is byte-for-byte what json.dump(data, f, indent=4) gives.
+JSON_READ_CHUNK = 1 << 16
+
+def _write_json_array(f, key, items, compact, last=False):
+    if compact:
+        f.write(f'{json.dumps(key)}:[')
+        for i, item in enumerate(items):
+            f.write((",\n" if i else "\n") + json.dumps(item, separators=(",", ":")))
+        f.write("]" if last else "],")
+        return
+    f.write(f'    {json.dumps(key)}: [')
+    empty = True
+    for item in items:
+        f.write(("\n" if empty else ",\n") + "        "
+                + json.dumps(item, indent=4).replace("\n", "\n        "))
+        empty = False
+    f.write(("]" if empty else "\n    ]") + ("\n" if last else ",\n"))
+
+
+def _write_json_snapshot(filename, plans, members, seq, compact=False):
+    # Write to a temp file and rename it over the old snapshot, so a crash
+    # mid-write never leaves a truncated gym_data.json
+    tmp = filename + ".tmp"
+    with open(tmp, "w") as f:
+        f.write("{" if compact else "{\n")
+        _write_json_array(f, "workout_plans", plans, compact)
+        _write_json_array(f, "members", members, compact)
+        f.write(f'"journal_seq":{seq}}}' if compact else f'    "journal_seq": {seq}\n}}')
+    os.replace(tmp, filename)
+
+
+class _JsonStreamReader:
+    # Pulls one JSON value at a time out of a text file
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size=JSON_READ_CHUNK):
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        chunk = self.f.read(size)
+        if not chunk:
+            self.eof = True
+        self.buf += chunk
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos:self.pos + 1]
+            self._fill()
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in JSON snapshot at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number may run past the buffer, so only trust a value
+                # that ends before it unless the file is exhausted
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill(max(JSON_READ_CHUNK, len(self.buf)))
+
+
+def _iter_json_snapshot(f):
+    # Yields (key, value) for scalar members of the top-level object and
+    # (key, item) for every element of its arrays, in file order.
+    reader = _JsonStreamReader(f)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield key, reader.value()
+                    if reader.peek() == "]":
+                        reader.pos += 1
+                        break
+                    reader.expect(",")
+        else:
+            yield key, reader.value()
+        if reader.peek() == "}":
+            return
+        reader.expect(",")
+
+
+# --- Binary snapshots ---
+# A versioned, stdlib-only alternative to the JSON snapshot that loads in a
+# fraction of the time. Little-endian, laid out as:
+#   header      BINARY_HEADER: magic, version, flags, journal_seq, then the
+#               string, plan, exercise, member, attendance and payment counts
+#               and the byte size of the string data
+#   strings     uint32 length (in characters) of each string, then all of
+#               them as one UTF-8 blob; everything else refers to strings
+#               by index
+#   plans       uint32 (plan_id, name, focus_area, exercise count) per plan,
+#               then uint32 exercise names for all plans
+#   members     one column per field: uint32 member_id, uint32 name,
+#               int32 age, int32 join day, int32 plan row (-1 = none),
+#               uint32 attendance count, uint32 payment count
+#   attendance  int32 day ordinals, member by member, each member's sorted
+#   payments    int32 day ordinals, then float64 amounts, member by member
+BINARY_MAGIC = b"PTGMSNAP"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<8sHHQIIIIQQQ")
+BINARY_SUFFIX = ".bin"
+
+def snapshot_format(filename):
+    # Format save_to_file uses for `filename` unless told otherwise
+    if filename.endswith(BINARY_SUFFIX):
+        return "binary"
+    if filename.endswith(SHARDED_SUFFIX) or os.path.isdir(filename):
+        return "sharded"
+    return "json"
+
+def _is_binary_snapshot(filename):
+    try:
+        with open(filename, "rb") as f:
+            return f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+    except FileNotFoundError:
+        return False
+
+def _le(values):
+    # An array's bytes in file (little-endian) order
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _pack_binary_snapshot(plans, members, seq):
+    # The whole snapshot as a list of byte strings. Members' logs are
+    # copied as arrays, so this is cheap enough to run under the lock.
+    strings = {}
+    def ref(text):
+        index = strings.get(text)
+        if index is None:
+            index = strings[text] = len(strings)
+        return index
+
+    plan_rows, exercises, plan_index = array("I"), array("I"), {}
+    for plan in plans:
+        plan_index[plan.plan_id] = len(plan_index)
+        plan_rows.extend((ref(plan.plan_id), ref(plan.name), ref(plan.focus_area), len(plan.exercises)))
+        exercises.extend(map(ref, plan.exercises))
+
+    ids, names, attended, paid = array("I"), array("I"), array("I"), array("I")
+    ages, joined, plan_of = array("i"), array("i"), array("i")
+    attendance, pay_days, pay_amounts = array("i"), array("i"), array("d")
+    for member in members:
+        days = member.attendance_days()
+        ids.append(ref(member.member_id))
+        names.append(ref(member.name))
+        ages.append(member.age)
+        joined.append(member.join_date.toordinal())
+        plan_of.append(plan_index.get(member.workout_plan.plan_id, -1) if member.workout_plan else -1)
+        attended.append(len(days))
+        paid.append(len(member.payment_log))
+        attendance.extend(days)
+        for day, amount in member.payment_log:
+            pay_days.append(day.toordinal())
+            pay_amounts.append(amount)
+
+    blob = "".join(strings).encode("utf-8")
+    header = BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, seq, len(strings), len(plan_index),
+                                len(exercises), len(ids), len(attendance), len(pay_days), len(blob))
+    lengths = array("I", map(len, strings))
+    return [header, _le(lengths), blob, _le(plan_rows), _le(exercises),
+            _le(ids), _le(names), _le(ages), _le(joined), _le(plan_of), _le(attended), _le(paid),
+            _le(attendance), _le(pay_days), _le(pay_amounts)]
+
+
+def _write_snapshot_chunks(filename, chunks):
+    # Same temp-file-and-rename as _write_json_snapshot
+    tmp = filename + ".tmp"
+    with open(tmp, "wb") as f:
+        f.writelines(chunks)
+    os.replace(tmp, filename)
+
+
+def _read_binary_snapshot(filename):
+    # -> (plans, members, journal_seq), built straight from the columns
+    with open(filename, "rb") as f:
+        data = memoryview(f.read())
+    if len(data) < BINARY_HEADER.size:
+        raise ValueError(f"{filename} is too short to be a binary gym snapshot")
+    (magic, version, _, seq, n_strings, n_plans, n_exercises, n_members,
+     n_attendance, n_payments, blob_size) = BINARY_HEADER.unpack_from(data)
+    if magic != BINARY_MAGIC:
+        raise ValueError(f"{filename} is not a binary gym snapshot")
+    if version != BINARY_VERSION:
+        raise ValueError(f"{filename} is snapshot version {version}, expected {BINARY_VERSION}")
+    size = (BINARY_HEADER.size + 4 * n_strings + blob_size + 16 * n_plans + 4 * n_exercises
+            + 28 * n_members + 4 * n_attendance + 12 * n_payments)
+    if len(data) != size:
+        raise ValueError(f"{filename} is {len(data)} bytes, its header says {size}: truncated or damaged")
+    pos = BINARY_HEADER.size
+    def column(typecode, count):
+        nonlocal pos
+        values = array(typecode)
+        end = pos + count * values.itemsize
+        values.frombytes(data[pos:end])
+        if sys.byteorder == "big":
+            values.byteswap()
+        pos = end
+        return values
+
+    offsets = [0, *accumulate(column("I", n_strings))]
+    text = str(data[pos:pos + blob_size], "utf-8")
+    pos += blob_size
+    strings = [text[start:end] for start, end in zip(offsets, offsets[1:])]
+
+    plan_rows, exercises = column("I", 4 * n_plans), column("I", n_exercises)
+    plans, at = [], 0
+    for i in range(0, len(plan_rows), 4):
+        plan_id, name, focus, count = plan_rows[i:i + 4]
+        plans.append(WorkoutPlan(strings[plan_id], strings[name], strings[focus],
+                                 [strings[e] for e in exercises[at:at + count]]))
+        at += count
+
+    ids, names = column("I", n_members), column("I", n_members)
+    ages, joined, plan_of = column("i", n_members), column("i", n_members), column("i", n_members)
+    attended, paid = column("I", n_members), column("I", n_members)
+    attendance = column("i", n_attendance)
+    pay_days, pay_amounts = column("i", n_payments), column("d", n_payments)
+
+    members, a, p = [], 0, 0
+    for i in range(n_members):
+        member = Member(strings[ids[i]], strings[names[i]], ages[i], _ordinal_date(joined[i]))
+        if plan_of[i] >= 0:
+            member.workout_plan = plans[plan_of[i]]
+        # Both logs were saved sorted, so they skip the setters' sort
+        member._attendance_log = attendance[a:a + attended[i]]
+        member._payment_log = [Payment(_ordinal_date(day), amount) for day, amount
+                               in zip(pay_days[p:p + paid[i]], pay_amounts[p:p + paid[i]])]
+        a += attended[i]
+        p += paid[i]
+        members.append(member)
+    return plans, members, seq
+
+
+# --- Sharded snapshots ---
+# A directory instead of one file, so a save only rewrites what changed and
+# a load can decode the shards on several cores:
+#   manifest.json     version, shard count, member count and journal_seq
+#   plans.json        workout plans and the member IDs in join order
+#   members-NNN.json  members whose ID hashes to shard NNN, as an ordinary
+#                     JSON snapshot without plans
+# Each file keeps the journal_seq it was written at, so replaying the
+# journal after a save that crashed part-way skips changes a file already has.
+SHARDED_SUFFIX = ".shards"
+SHARDED_VERSION = 1
+DEFAULT_SHARDS = 16
+SHARD_POOL_MIN_MEMBERS = 20000   # "auto" only starts a process pool from this size
+# Changes that rewrite plans.json (plans, or the member order)
+SHARD_INDEX_OPS = ("register", "remove_member", "add_plan", "remove_plan")
+
+def shard_of(member_id, shards):
+    # Stable across runs, unlike hash()
+    return zlib.crc32(member_id.encode()) % shards
+
+def _shard_file(dirname, shard):
+    return os.path.join(dirname, f"members-{shard:03d}.json")
+
+def _record_member_id(record):
+    # The member a journal record (or _record fields) changes, if any
+    if "member" in record:
+        return record["member"]["member_id"]
+    return record.get("member_id")
+
+def _write_json_file(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+def _read_manifest(dirname):
+    try:
+        with open(os.path.join(dirname, "manifest.json")) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    if manifest.get("version") != SHARDED_VERSION:
+        raise ValueError(f"{dirname} is sharded snapshot version {manifest.get('version')}, "
+                         f"expected {SHARDED_VERSION}")
+    return manifest
+
+def _write_sharded_snapshot(dirname, snap):
+    # Shards first and the manifest last, see above
+    seq = snap["journal_seq"]
+    os.makedirs(dirname, exist_ok=True)
+    for shard, members in snap["members"].items():
+        _write_json_snapshot(_shard_file(dirname, shard), [],
+                             (member.to_dict() for member in members), seq, compact=True)
+    if snap["plans"] is not None:
+        _write_json_file(os.path.join(dirname, "plans.json"), {
+            "workout_plans": snap["plans"], "member_order": snap["member_order"], "journal_seq": seq})
+    _write_json_file(os.path.join(dirname, "manifest.json"), {
+        "version": SHARDED_VERSION, "shards": snap["shards"],
+        "members": snap["member_count"], "journal_seq": seq})
+    if snap["full"]:
+        # Left over from an earlier, larger shard count
+        for shard in range(snap["shards"], 1000):
+            if not os.path.exists(_shard_file(dirname, shard)):
+                break
+            os.remove(_shard_file(dirname, shard))
+
+def _load_shard(path, plans):
+    # May run in a worker process: takes plain plan dicts and returns
+    # (journal_seq, members), whose plans are copies to be swapped for the
+    # loading manager's own
+    workout_plans = {plan["plan_id"]: WorkoutPlan.from_dict(plan) for plan in plans}
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return 0, []
+    # A whole shard of fresh containers only sets off collections that find
+    # no garbage; pausing them saves about a tenth of the load time
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return data["journal_seq"], [Member.from_dict(m, workout_plans) for m in data["members"]]
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class GymManager:
+    def __init__(self, storage=None):
         self.members = {}         # member_id -> Member object
         self.workout_plans = {}   # plan_id -> WorkoutPlan object
+        # Optional StorageBackend (see Storage.py): members are then loaded
+        # on demand and reports run against the backend instead of memory.
+        self.storage = storage
+        if storage is not None:
+            self.workout_plans = storage.load_plans()
+            self.members = storage.member_view(self.workout_plans)
+        self._journal = None      # open journal file while journaling is on
+        self._group = threading.local()  # .records: held back by this thread's journal_group()
+        self._journal_end = None  # (journal path, end of its last whole record) from the last replay
+        self._snapshot_file = None
+        self._compact_bytes = JOURNAL_COMPACT_BYTES
+        self._seq = 0             # sequence number of the last journaled change
+        self._replaying = False
+        # See "GymManager locking" above. A storage backend shares one
+        # connection and cache, so there every access is exclusive.
+        self.lock = RWLock(shared=storage is None)
+        self._member_locks = [threading.Lock() for _ in range(MEMBER_LOCK_STRIPES)]
+        self._state_lock = threading.RLock()
+        self._save_lock = threading.Lock()   # one snapshot write at a time
+        self._compact_due = False       # journal outgrew _compact_bytes under a lock
+        self.saver = None               # BackgroundSaver writing snapshots, if any
+        self._batch_depth = 0           # > 0 inside batch(): persist once at the end
+        self._attendance_by_date = None # day ordinal -> set of member_ids (lazy)
+        self.attendance_store = None    # AttendanceStore replacing the above, if enabled
+        self.bitmap = None              # AttendanceBitmap kept alongside, if enabled
+        self._members_by_plan = {}      # plan_id -> set of member_ids
+        self._last_paid = {}            # member_id -> latest payment date
+        self._paid_order = []           # sorted (latest payment date, member_id)
+        self._never_paid = {}           # member_ids with no payment, in join order
+        self._member_order = None       # member_ids in join order, for paging
+        self._search = ([], [], [])     # sorted (key, member_id) per _search_keys rank
+        self.version = 0                # bumped by every change
+        self._part_versions = {part: 0 for part in ("members", "plans", "attendance", "payments")}
+        self._stats_cache = {}          # stats section -> (versions + day, value)
+        self._shard_dir = None          # sharded snapshot last loaded or saved, if any
+        self._shard_count = 0
+        self._dirty_shards = set()      # its shards changed since then
+        self._plans_dirty = False       # and whether its plans.json did
     
+    @_locked
     def register_member(self,member):
         if member.member_id in self.members:
             return f'This member is already registered.'
         else:
             self.members[member.member_id] = member
+            self._index_member(member)
+            self._record("register", member=member.to_dict())
             return f'Member has been successfully registered.'
         
+    @_locked
     def remove_member(self,member_id):
         if member_id in self.members:
-            self.members.pop(member_id)
+            self._unindex_member(self.members.pop(member_id))
+            self._record("remove_member", member_id=member_id)
             return "This member has been successfully removed from the gym's database."
         else:
             return 'This is person is not a current member of the gym.'
@@ -101,49 +989,124 @@ class GymManager:
     def get_members_info(self,member_id):
         return self.members.get(member_id)
 
+    def member_count(self):
+        return len(self.members)
+
+    @_shared
+    def member_page(self, offset, limit):
+        # Members offset..offset+limit in join order, for tables that only
+        # show a window of rows at a time
+        if self.storage is not None:
+            member_ids = self.storage.member_ids_page(offset, limit)
+        else:
+            if self._member_order is None:
+                self._member_order = list(self.members)
+            member_ids = self._member_order[offset:offset + limit]
+        return [self.members[member_id] for member_id in member_ids]
+
+    @_shared
+    def search_members(self, query, limit=10):
+        # Members whose ID, name, or any later word of the name starts with
+        # `query` (case-insensitive). Exact ID first, then ID prefixes, then
+        # name matches.
+        query = " ".join(query.lower().split())
+        if not query:
+            return []
+        if self.storage is not None:
+            return [self.members[mid] for mid in self.storage.search_member_ids(query, limit)]
+        found = {}
+        for keys in self._search:
+            i = bisect_left(keys, (query,))
+            while i < len(keys) and len(found) < limit and keys[i][0].startswith(query):
+                found.setdefault(keys[i][1])
+                i += 1
+        return [self.members[member_id] for member_id in found]
+
+    @_shared
     def get_payment_logs(self):
         log = []
         for member_id,member in self.members.items():
-            log.append(f'{member_id} - {member.name} : {member.get_payment_history}')
+            log.append(f'{member_id} - {member.name} : {member.get_payment_history()}')
         return '\n'.join(log)
     
+    @_indexed
     def get_unpaid_members(self, cutoff_date):
-        unpaid = []
-        for member in self.members.values():
-            if not member.payment_log or member.payment_log[-1][0] < cutoff_date:
-                unpaid.append(member)
-        return unpaid
+        if self.storage is not None:
+            return [self.members[mid] for mid in self.storage.unpaid_member_ids(_iso(cutoff_date))]
+        cutoff = bisect_left(self._paid_order, (_as_date(cutoff_date),))
+        unpaid = list(self._never_paid)
+        unpaid.extend(member_id for _, member_id in self._paid_order[:cutoff])
+        return [self.members[member_id] for member_id in unpaid]
+
+    @_indexed
+    def unpaid_count(self, cutoff_date):
+        if self.storage is not None:
+            return len(self.storage.unpaid_member_ids(_iso(cutoff_date)))
+        return len(self._never_paid) + bisect_left(self._paid_order, (_as_date(cutoff_date),))
 
+    @_indexed
+    def last_payment_date(self, member_id):
+        if self.storage is not None:
+            last = self.storage.last_payment_date(member_id)
+            return _as_date(last) if last else None
+        return self._last_paid.get(member_id)
+
+    @_indexed
+    def billing_counts(self, month):
+        # Members whose latest payment falls in the month containing `month`
+        first = month.replace(day=1)
+        following = (first + timedelta(days=32)).replace(day=1)
+        if self.storage is not None:
+            paid = self.storage.paid_count(first.isoformat(), following.isoformat())
+        else:
+            paid = (bisect_left(self._paid_order, (following,))
+                    - bisect_left(self._paid_order, (first,)))
+        return {"paid": paid, "overdue": len(self.members) - paid}
+
+    @_locked
     def add_workoutplan(self,plan):
         if plan.plan_id in self.workout_plans:
             return 'This workout plan has already been created.'
         else:
             self.workout_plans[plan.plan_id] = plan
+            self._record("add_plan", plan=plan.to_dict())
             return 'The workout plan has been successfully added to the system.'
     
+    @_locked
     def remove_workoutplan(self,plan_id):
-        for member in self.members.values():
-            if member.workout_plan and member.workout_plan.plan_id == plan_id:
-                member.workout_plan = None
-                print(member.workout_plan)
+        for member in self.members_on_plan(plan_id):
+            member.workout_plan = None
+            self._mark_dirty(member.member_id)
+        self._members_by_plan.pop(plan_id, None)
         if plan_id in self.workout_plans:
             self.workout_plans.pop(plan_id)
+            self._record("remove_plan", plan_id=plan_id)
             return f"{plan_id} has been successfully removed from the gym's database."
 
+    @_locked
     def assign_workoutplan(self,plan_id,member_id):
         if member_id in self.members and plan_id in self.workout_plans:
             member = self.members[member_id]
             workout_plan = self.workout_plans[plan_id]
-            return member.assign_plan(workout_plan)
+            if member.workout_plan:
+                self._plan_index_discard(member.workout_plan.plan_id, member_id)
+            msg = member.assign_plan(workout_plan)
+            if self.storage is None:
+                self._members_by_plan.setdefault(plan_id, set()).add(member_id)
+            self._record("assign", plan_id=plan_id, member_id=member_id)
+            return msg
         else:
             return 'Invalid member ID or workout plan ID.'
     
+    @_locked
     def unassign_workoutplan(self,plan_id,member_id):
         if member_id not in self.members:
             return f"Member ID: {member_id} was not found in the gym's database."
         member = self.members[member_id]
         if member.workout_plan and member.workout_plan.plan_id == plan_id:
             member.workout_plan = None
+            self._plan_index_discard(plan_id, member_id)
+            self._record("unassign", plan_id=plan_id, member_id=member_id)
             return f'{plan_id} has been successfully unassigned from member {member_id}.'
         else:
             return f'{plan_id} is not currently assigned to member {member_id}.'
@@ -154,52 +1117,856 @@ class GymManager:
     def get_workoutplans_info(self,plan_id):
         return self.workout_plans.get(plan_id)
     
+    def _member_lock(self, member_id):
+        return self._member_locks[hash(member_id) % MEMBER_LOCK_STRIPES]
+
+    @_shared
     def log_attendance(self, date, member_id):
         if member_id in self.members:
-            self.members[member_id].attendance(date)
-            return f"{member_id} has successfully been logged in for: {date}."
+            try:
+                day = _as_date(date)
+            except ValueError:
+                return f'{date} is not a valid date (YYYY-MM-DD).'
+            with self._member_lock(member_id):
+                self.members[member_id].attendance(day)
+                with self._state_lock:
+                    if self._attendance_by_date is not None:
+                        self._attendance_by_date.setdefault(day.toordinal(), set()).add(member_id)
+                    if self.bitmap is not None:
+                        self._bitmap_add(member_id, [day.toordinal()])
+                    self._record("attend", member_id=member_id, date=day.isoformat())
+            return f"{member_id} has successfully been logged in for: {day}."
+        else:
+            return f'This person is currently not a member at the gym.'
+
+    @_shared
+    def add_payment(self, date, amount, member_id):
+        if member_id in self.members:
+            try:
+                day = _as_date(date)
+            except ValueError:
+                return f'{date} is not a valid date (YYYY-MM-DD).'
+            with self._member_lock(member_id):
+                msg = self.members[member_id].add_payment(day, amount)
+                with self._state_lock:
+                    if self.storage is None:
+                        self._track_payment(member_id, day)
+                    self._record("pay", member_id=member_id, date=day.isoformat(), amount=amount)
+            return msg
         else:
             return f'This person is currently not a member at the gym.'
         
+    @_shared
     def get_member_attendance_report(self,member_id):
         member = self.members[member_id]
         if not member:
             return f'Member ID {member_id} was not found.'
         
-        if not member.attendance_log:
+        with self._member_lock(member_id):
+            attendance_log = member.attendance_log
+        if not attendance_log:
             return f'No attendance records for {member.name}.'
         
-        attendance_days = '\n'.join(member.attendance_log)
+        attendance_days = '\n'.join(day.isoformat() for day in attendance_log)
         return f'Attendance for {member.name} ({member_id}): \n{attendance_days}'
+
+    # --- Bulk changes ---
+    # Rows come from any iterable (e.g. a csv.DictReader) and are validated
+    # and applied one at a time, so memory stays flat however long the input
+    # is. Bad rows are counted and reported, never abort the batch, and the
+    # whole batch is persisted once at the end.
+    @contextmanager
+    def batch(self):
+        with self._state_lock:
+            self._batch_depth += 1
+            if self._batch_depth == 1 and self.storage is not None:
+                self.storage.begin()
+        try:
+            yield
+        finally:
+            with self._state_lock:
+                self._batch_depth -= 1
+                done = self._batch_depth == 0
+            if done:
+                # Changes inside were never journaled nor asked the saver for
+                # a snapshot, so ask now or flush() would find nothing to do
+                if self.saver is not None:
+                    self.saver.request(now=True)
+                self.flush()
+
+    @contextmanager
+    def journal_group(self):
+        # Group commit for log appends (check-ins and payments): every change
+        # inside still gets its own journal record, but the thread's records
+        # are numbered and written in one go at the end (unlike batch(), which
+        # skips the journal and saves a snapshot). Holds the lock shared, so
+        # reads and other appends carry on, while a snapshot copy waits for
+        # the group to land in the journal as a whole.
+        if getattr(self._group, "records", None) is not None:
+            yield   # nested in another group
+            return
+        with self.lock.read():
+            self._group.records = []
+            if self.storage is not None:
+                self.storage.begin()
+            try:
+                yield
+            finally:
+                records, self._group.records = self._group.records, None
+                if self.storage is not None:
+                    self.storage.commit()
+                if records:
+                    with self._state_lock:
+                        self._write_records(records)
+        self._compact_if_due()
+
+    def _bulk(self, rows, apply_row):
+        result = {"applied": 0, "failed": 0, "errors": []}
+        with self.batch():
+            for row_no, row in enumerate(rows, start=1):
+                try:
+                    apply_row(row)
+                except (KeyError, ValueError, TypeError, AttributeError) as e:
+                    result["failed"] += 1
+                    if len(result["errors"]) < MAX_BULK_ERRORS:
+                        result["errors"].append((row_no, str(e)))
+                else:
+                    result["applied"] += 1
+        return result
+
+    def bulk_register(self, rows):
+        # rows: mappings with member_id, name, age and optional join_date, plan_id
+        def register(row):
+            member_id = _clean_text(row.get("member_id"))
+            name = _clean_text(row.get("name"))
+            if not (member_id and name):
+                raise ValueError("member_id and name are required")
+            try:
+                age = int(row.get("age"))
+            except (TypeError, ValueError):
+                raise ValueError(f"age must be a whole number, got {row.get('age')!r}") from None
+            join_date = _clean_date(row.get("join_date") or date.today())
+            plan_id = _clean_text(row.get("plan_id")) or None
+            if member_id in self.members:
+                raise ValueError(f"member {member_id} is already registered")
+            if plan_id and plan_id not in self.workout_plans:
+                raise ValueError(f"unknown plan {plan_id}")
+            self.register_member(Member(member_id, name, age, join_date))
+            if plan_id:
+                self.assign_workoutplan(plan_id, member_id)
+        return self._bulk(rows, register)
+
+    def bulk_log_attendance(self, rows):
+        # rows: mappings with member_id and date
+        def attend(row):
+            member_id = _clean_text(row.get("member_id"))
+            day = _clean_date(row.get("date"))
+            if member_id not in self.members:
+                raise ValueError(f"unknown member {member_id!r}")
+            self.log_attendance(day, member_id)
+        return self._bulk(rows, attend)
+
+    def bulk_add_payments(self, rows):
+        # rows: mappings with member_id, date and amount
+        def pay(row):
+            member_id = _clean_text(row.get("member_id"))
+            day = _clean_date(row.get("date"))
+            try:
+                amount = float(row.get("amount"))
+            except (TypeError, ValueError):
+                raise ValueError(f"amount must be a number, got {row.get('amount')!r}") from None
+            if amount <= 0:
+                raise ValueError(f"amount must be positive, got {amount}")
+            if member_id not in self.members:
+                raise ValueError(f"unknown member {member_id!r}")
+            self.add_payment(day, amount, member_id)
+        return self._bulk(rows, pay)
+
+    # --- Journal ---
+    # While journaling is on, every change appends one compact JSON line to
+    # "<snapshot>.journal" instead of rewriting the whole snapshot. Records
+    # carry a sequence number and the snapshot stores the last one it
+    # includes, so replaying a journal that was already folded in is a no-op.
+    @_locked
+    def open_journal(self, filename="gym_data.json", compact_bytes=JOURNAL_COMPACT_BYTES):
+        self.close_journal()
+        self._snapshot_file = filename
+        self._compact_bytes = compact_bytes
+        path = journal_path(filename)
+        # Cut a torn last line off before appending, or the next record
+        # would be glued onto it and replay would stop there for good
+        if os.path.exists(path):
+            if self._journal_end is not None and self._journal_end[0] == path:
+                good = self._journal_end[1]
+            else:
+                good = 0
+                for _, good in _journal_records(path):
+                    pass
+            if os.path.getsize(path) > good:
+                os.truncate(path, good)
+        self._journal_end = None   # appends below make it out of date
+        self._journal = open(path, "a")
+
+    @_locked
+    def close_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def compact(self):
+        if self._snapshot_file is not None:
+            self.save_to_file(self._snapshot_file)
+
+    def _compact_if_due(self):
+        # Compaction writes a snapshot, which must not start while this
+        # thread holds the lock (see save_to_file), so _record only asks for it
+        if self._compact_due and not self.lock.held():
+            self._compact_due = False
+            self.compact()
+
+    def flush(self):
+        # Make every change so far durable in whichever store is in use
+        if self.storage is not None:
+            self.storage.commit()
+        if self.bitmap is not None:
+            self.bitmap.flush()
+        if self.saver is not None:
+            self.saver.flush()
+        else:
+            self.compact()
+
+    def _record(self, op, **fields):
+        with self._state_lock:
+            self._record_locked(op, fields)
+
+    def _record_locked(self, op, fields):
+        self._bump(*CHANGE_PARTS[op])
+        self._mark_dirty(_record_member_id(fields), op in SHARD_INDEX_OPS)
+        if self._replaying:
+            return
+        if self.storage is not None:
+            self.storage.apply(op, fields)
+        if self._batch_depth:
+            return
+        if self.saver is not None:
+            self.saver.request()
+        if self._journal is None:
+            return
+        fields["op"] = op
+        records = getattr(self._group, "records", None)
+        if records is not None:
+            records.append(fields)
+            return
+        self._write_records([fields])
+
+    def _write_records(self, records):
+        # Numbers the records and appends them to the journal in one write
+        if self._journal is None:
+            return
+        lines = []
+        for fields in records:
+            self._seq += 1
+            fields["seq"] = self._seq
+            lines.append(json.dumps(fields, separators=(",", ":")) + "\n")
+        if self.bitmap is not None:
+            self.bitmap.note_seq(self._seq)
+        self._journal.write("".join(lines))
+        self._journal.flush()
+        if self._journal.tell() >= self._compact_bytes and self.saver is None:
+            self._compact_due = True
+
+    def _apply(self, record):
+        op = record["op"]
+        if op == "register":
+            self.register_member(Member.from_dict(record["member"], self.workout_plans))
+        elif op == "remove_member":
+            self.remove_member(record["member_id"])
+        elif op == "add_plan":
+            self.add_workoutplan(WorkoutPlan.from_dict(record["plan"]))
+        elif op == "remove_plan":
+            self.remove_workoutplan(record["plan_id"])
+        elif op == "assign":
+            self.assign_workoutplan(record["plan_id"], record["member_id"])
+        elif op == "unassign":
+            self.unassign_workoutplan(record["plan_id"], record["member_id"])
+        elif op == "attend":
+            self.log_attendance(record["date"], record["member_id"])
+        elif op == "pay":
+            self.add_payment(record["date"], record["amount"], record["member_id"])
+
+    def _replay_journal(self, filename, saved_in=None):
+        # saved_in(record): the journal_seq of the file that would hold the
+        # record, when that can be newer than the snapshot's (sharded)
+        self._replaying = True
+        path = journal_path(filename)
+        self._journal_end = (path, 0)
+        try:
+            for record, end in _journal_records(path):
+                self._journal_end = (path, end)
+                if record.get("seq", 0) <= self._seq:
+                    continue
+                if saved_in is not None and record["seq"] <= saved_in(record):
+                    self._seq = record["seq"]
+                    continue
+                self._apply(record)
+                self._seq = record["seq"]
+        except FileNotFoundError:
+            pass
+        finally:
+            self._replaying = False
+            if self.bitmap is not None:
+                self.bitmap.note_seq(self._seq)
         
-    def save_to_file(self, filename="gym_data.json"):
-        data = {
-            "workout_plans": [plan.to_dict() for plan in self.workout_plans.values()],
-            "members": [member.to_dict() for member in self.members.values()]
+    def save_to_file(self, filename="gym_data.json", compact=False, format=None, shards=None):
+        # format: "json", "binary" or "sharded", by default from the file name
+        # (*.bin is binary, *.shards or a directory sharded). compact=True
+        # drops the JSON indentation: smaller and faster to write/parse.
+        # shards: shard count for a sharded snapshot, see sharded_snapshot().
+        # Only copying the data holds the lock; encoding and writing it
+        # happen after, while changes carry on.
+        if self.lock.held():
+            raise RuntimeError("save_to_file can not be called while holding the manager's lock")
+        format = format or snapshot_format(filename)
+        with self._save_lock:
+            if format == "sharded":
+                snap = self.sharded_snapshot(filename, shards)
+                try:
+                    _write_sharded_snapshot(filename, snap)
+                except Exception:
+                    self.sharded_unsaved(snap)
+                    raise
+                seq = snap["journal_seq"]
+            else:
+                plans, members, seq = self._copy_all()
+                if format == "binary":
+                    _write_snapshot_chunks(filename, _pack_binary_snapshot(plans, members, seq))
+                else:
+                    _write_json_snapshot(filename, (plan.to_dict() for plan in plans),
+                                         (member.to_dict() for member in members), seq, compact)
+            self.snapshot_saved(filename, seq)
+
+    @_locked
+    def _copy_all(self):
+        # (plans, member copies, journal_seq), consistent with each other and
+        # quick to take next to encoding them
+        return (list(self.workout_plans.values()),
+                [member.copy() for member in self.members.values()], self._seq)
+
+    def snapshot(self):
+        # Plain-data copy of everything as of its journal_seq
+        plans, members, seq = self._copy_all()
+        return {
+            "workout_plans": [plan.to_dict() for plan in plans],
+            "members": [member.to_dict() for member in members],
+            "journal_seq": seq
         }
-        with open(filename, "w") as f:
-            json.dump(data, f, indent=4)
+
+    def packed_snapshot(self):
+        # Binary snapshot as byte strings, as of the current journal_seq
+        return _pack_binary_snapshot(*self._copy_all())
+
+    @_locked
+    def sharded_snapshot(self, dirname, shards=None):
+        # What saving to the sharded snapshot `dirname` has to write: all of
+        # it the first time (or when the shard count changes), after that
+        # only the shards and plans changed since the last load or save
+        full = dirname != self._shard_dir or shards not in (None, self._shard_count)
+        if full:
+            count = shards or DEFAULT_SHARDS
+            members = {shard: [] for shard in range(count)}
+        else:
+            count = self._shard_count
+            members = {shard: [] for shard in self._dirty_shards}
+        if members:
+            for member_id, member in self.members.items():
+                shard = shard_of(member_id, count)
+                if shard in members:
+                    members[shard].append(member.copy())
+        write_plans = full or self._plans_dirty
+        snap = {
+            "full": full,
+            "shards": count,
+            "members": members,
+            "member_count": len(self.members),
+            "plans": [plan.to_dict() for plan in self.workout_plans.values()] if write_plans else None,
+            "member_order": list(self.members) if write_plans else None,
+            "journal_seq": self._seq,
+        }
+        self._shard_dir, self._shard_count = dirname, count
+        self._dirty_shards, self._plans_dirty = set(), False
+        return snap
+
+    @_locked
+    def sharded_unsaved(self, snap):
+        # Writing `snap` failed: mark what it held as changed again
+        if snap["full"]:
+            self._shard_dir = None
+        else:
+            self._dirty_shards.update(snap["members"])
+            self._plans_dirty = self._plans_dirty or snap["plans"] is not None
+
+    def _mark_dirty(self, member_id=None, plans=False):
+        if self._shard_dir is None:
+            return
+        if member_id is not None:
+            self._dirty_shards.add(shard_of(member_id, self._shard_count))
+        if plans:
+            self._plans_dirty = True
+
+    @_locked
+    def snapshot_saved(self, filename, seq):
+        # `filename` now holds every change up to `seq`: drop those from the
+        # journal, keeping any recorded while the snapshot was being written
+        if self._journal is None or filename != self._snapshot_file:
+            if os.path.exists(journal_path(filename)):
+                os.remove(journal_path(filename))
+            return
+        if seq == self._seq:
+            self._journal.seek(0)
+            self._journal.truncate()
+            return
+        self._journal.close()
+        path = journal_path(filename)
+        with open(path, "r") as f:
+            keep = [line for line in f if json.loads(line)["seq"] > seq]
+        with open(path + ".tmp", "w") as f:
+            f.writelines(keep)
+        os.replace(path + ".tmp", path)
+        self._journal = open(path, "a")
     
-    def load_from_file(self, filename="gym_data.json"):
+    @_locked
+    def load_from_file(self, filename="gym_data.json", format=None, processes="auto"):
+        # format: "json", "binary" or "sharded"; detected from the file when
+        # not given. processes: see _load_sharded
+        if format == "sharded" or (format is None and snapshot_format(filename) == "sharded"):
+            self._load_sharded(filename, processes)
+            return
+        if format == "binary" or (format is None and _is_binary_snapshot(filename)):
+            plans, members, self._seq = _read_binary_snapshot(filename)
+            for plan in plans:
+                self.workout_plans[plan.plan_id] = plan
+            for member in members:
+                self.members[member.member_id] = member
+            self._rebuild_indexes()
+            self._replay_journal(filename)
+            return
         try:
             with open(filename, "r") as f:
-                data = json.load(f)
-                # First load plans
-                for plan_data in data.get("workout_plans", []):
-                    plan = WorkoutPlan.from_dict(plan_data)
-                    self.workout_plans[plan.plan_id] = plan
-                # Then load members
-                for member_data in data.get("members", []):
+                early_members = []   # members listed before the plans they reference
+                for key, value in _iter_json_snapshot(f):
+                    if key == "workout_plans":
+                        plan = WorkoutPlan.from_dict(value)
+                        self.workout_plans[plan.plan_id] = plan
+                    elif key == "members":
+                        if value["workout_plan_id"] and value["workout_plan_id"] not in self.workout_plans:
+                            early_members.append(value)
+                            continue
+                        member = Member.from_dict(value, self.workout_plans)
+                        self.members[member.member_id] = member
+                    elif key == "journal_seq":
+                        self._seq = value
+                for member_data in early_members:
                     member = Member.from_dict(member_data, self.workout_plans)
                     self.members[member.member_id] = member
         except FileNotFoundError:
             pass
+        self._rebuild_indexes()
+        # Then replay anything journaled since that snapshot
+        self._replay_journal(filename)
+
+    def _load_sharded(self, dirname, processes="auto"):
+        # processes > 1 decodes the shards in a process pool; "auto" does so
+        # with every CPU once the gym has SHARD_POOL_MIN_MEMBERS members
+        manifest = _read_manifest(dirname)
+        count = manifest["shards"] if manifest else DEFAULT_SHARDS
+        index = {"workout_plans": [], "member_order": [], "journal_seq": 0}
+        if manifest is not None:
+            with open(os.path.join(dirname, "plans.json")) as f:
+                index = json.load(f)
+            self._seq = manifest["journal_seq"]
+        for plan_data in index["workout_plans"]:
+            plan = WorkoutPlan.from_dict(plan_data)
+            self.workout_plans[plan.plan_id] = plan
+
+        paths = [_shard_file(dirname, shard) for shard in range(count)] if manifest else []
+        if processes == "auto":
+            processes = os.cpu_count() if manifest and manifest["members"] >= SHARD_POOL_MIN_MEMBERS else None
+        if processes and processes > 1 and len(paths) > 1:
+            with ProcessPoolExecutor(max_workers=min(processes, len(paths))) as pool:
+                parts = list(pool.map(_load_shard, paths, repeat(index["workout_plans"])))
+        else:
+            parts = [_load_shard(path, index["workout_plans"]) for path in paths]
+
+        loaded = {}
+        for _, members in parts:
+            for member in members:
+                if member.workout_plan is not None:
+                    member.workout_plan = self.workout_plans.get(member.workout_plan.plan_id)
+                loaded[member.member_id] = member
+        for member_id in index["member_order"]:
+            member = loaded.pop(member_id, None)
+            if member is not None:
+                self.members[member_id] = member
+        self.members.update(loaded)   # only after a save that crashed part-way
+        self._rebuild_indexes()
+
+        self._shard_dir, self._shard_count = dirname, count
+        self._dirty_shards, self._plans_dirty = set(), bool(loaded)
+        shard_seqs = [seq for seq, _ in parts] or [0] * count
+        def saved_in(record):
+            member_id = _record_member_id(record)
+            if member_id is None:
+                return index["journal_seq"]
+            return shard_seqs[shard_of(member_id, count)]
+        self._replay_journal(dirname, saved_in)
+
+    # --- Indexes ---
+    # Kept in step with every change so that reports never scan members'
+    # logs. With a storage backend the backend's own indexes are used.
+    def _index_member(self, member, bulk=False):
+        self._member_order = None
+        if self.storage is not None:
+            return
+        for rank, key in _search_keys(member.member_id, member.name):
+            if bulk:
+                self._search[rank].append((key, member.member_id))
+            else:
+                insort(self._search[rank], (key, member.member_id))
+        if self.attendance_store is not None:
+            member.attach_attendance_store(self.attendance_store)
+        elif self._attendance_by_date is not None:
+            for day in member.attendance_days():
+                self._attendance_by_date.setdefault(day, set()).add(member.member_id)
+        if self.bitmap is not None and not bulk:
+            self._bitmap_add(member.member_id, member.attendance_days())
+        if member.workout_plan:
+            self._members_by_plan.setdefault(member.workout_plan.plan_id, set()).add(member.member_id)
+        if member.payment_log:
+            self._track_payment(member.member_id, member.last_payment().date, bulk)
+        else:
+            self._never_paid[member.member_id] = None
+
+    def _unindex_member(self, member):
+        self._member_order = None
+        if self.storage is not None:
+            return
+        for rank, key in _search_keys(member.member_id, member.name):
+            keys = self._search[rank]
+            del keys[bisect_left(keys, (key, member.member_id))]
+        if self.bitmap is not None:
+            self.bitmap.remove_member(member.member_id, len(member.attendance_days()))
+        if self.attendance_store is not None:
+            member.detach_attendance_store()
+            self.attendance_store.remove_member(member.member_id)
+        elif self._attendance_by_date is not None:
+            for day in member.attendance_days():
+                attendees = self._attendance_by_date.get(day)
+                if attendees is not None:
+                    attendees.discard(member.member_id)
+                    if not attendees:
+                        del self._attendance_by_date[day]
+        if member.workout_plan:
+            self._plan_index_discard(member.workout_plan.plan_id, member.member_id)
+        self._never_paid.pop(member.member_id, None)
+        last = self._last_paid.pop(member.member_id, None)
+        if last is not None:
+            del self._paid_order[bisect_left(self._paid_order, (last, member.member_id))]
+
+    def _track_payment(self, member_id, day, bulk=False):
+        # bulk: _rebuild_indexes sorts _paid_order once at the end
+        last = self._last_paid.get(member_id)
+        if last is not None and last >= day:
+            return   # back-dated payment; the latest one still stands
+        self._never_paid.pop(member_id, None)
+        self._last_paid[member_id] = day
+        if bulk:
+            return
+        if last is not None:
+            del self._paid_order[bisect_left(self._paid_order, (last, member_id))]
+        insort(self._paid_order, (day, member_id))
+
+    def _plan_index_discard(self, plan_id, member_id):
+        on_plan = self._members_by_plan.get(plan_id)
+        if on_plan is not None:
+            on_plan.discard(member_id)
+            if not on_plan:
+                del self._members_by_plan[plan_id]
+
+    @_locked
+    def use_attendance_store(self):
+        # Move every attendance log into one columnar AttendanceStore
+        # (needs numpy); attendance queries are then vectorized.
+        if self.attendance_store is not None or self.storage is not None:
+            return
+        self.attendance_store = AttendanceStore()
+        self._attendance_by_date = None
+        for member in self.members.values():
+            member.attach_attendance_store(self.attendance_store)
+
+    @_locked
+    def use_attendance_bitmap(self, path="gym_data.attendance"):
+        # Keep a memory-mapped member x day bitmap (see Bitmap.py, needs
+        # numpy) in step with the logs, for year-long heatmaps and "came in
+        # N times lately" queries. The file at `path` is reused as it is if
+        # it saw every change so far, and rebuilt from the logs if not.
+        if self.storage is not None:
+            raise RuntimeError("The attendance bitmap needs members in memory "
+                               "(JSON, binary or sharded snapshots), not a storage backend.")
+        if self.bitmap is not None:
+            self.bitmap.close()
+            self.bitmap = None
+        try:
+            bitmap = AttendanceBitmap(path)
+        except (FileNotFoundError, ValueError):
+            bitmap = None
+        if bitmap is not None and not self._bitmap_current(bitmap):
+            bitmap.close()
+            bitmap = None
+        if bitmap is None:
+            self._build_bitmap(path)
+        else:
+            self.bitmap = bitmap
+
+    def _bitmap_current(self, bitmap):
+        if bitmap.seq != self._seq or not bitmap.covers(date.today().toordinal()):
+            return False
+        checkins = 0
+        for member_id, member in self.members.items():
+            if member_id not in bitmap.rows:
+                return False
+            checkins += len(member.attendance_days())
+        return checkins == bitmap.checkins
+
+    def _build_bitmap(self, path):
+        if self.bitmap is not None:
+            self.bitmap.close()
+            self.bitmap = None
+        self.bitmap = AttendanceBitmap.build(
+            path, [(member_id, member.attendance_days()) for member_id, member in self.members.items()],
+            self._seq)
+
+    def _bitmap_add(self, member_id, days):
+        # days: sorted ordinals. The file only spans the days it was built
+        # for, so one outside them means building it again, wider.
+        if len(days) and not (self.bitmap.covers(days[0]) and self.bitmap.covers(days[-1])):
+            self._build_bitmap(self.bitmap.path)
+        elif len(days) == 1:
+            self.bitmap.add(member_id, days[0])
+        else:
+            self.bitmap.add_member(member_id, days)
+
+    def _bump(self, *parts):
+        self.version += 1
+        for part in parts:
+            self._part_versions[part] += 1
+
+    def _rebuild_indexes(self):
+        self._bump(*self._part_versions)
+        self._attendance_by_date = None
+        self._members_by_plan = {}
+        self._last_paid = {}
+        self._never_paid = {}
+        self._paid_order = []
+        self._search = ([], [], [])
+        for member in self.members.values():
+            self._index_member(member, bulk=True)
+        self._paid_order = sorted((day, member_id) for member_id, day in self._last_paid.items())
+        for keys in self._search:
+            keys.sort()
+        if self.bitmap is not None:
+            self._build_bitmap(self.bitmap.path)
+
+    def _attendance_index(self):
+        # Built on first use rather than on load: most sessions never ask
+        # who came on a given day, and building it dominates loading.
+        if self._attendance_by_date is None:
+            by_date = {}
+            for member_id, member in self.members.items():
+                for day in member.attendance_days():
+                    attendees = by_date.get(day)
+                    if attendees is None:
+                        by_date[day] = {member_id}
+                    else:
+                        attendees.add(member_id)
+            self._attendance_by_date = by_date
+        return self._attendance_by_date
+
+    @_indexed
+    def attendance_count(self, day):
+        if self.storage is not None:
+            return self.storage.attendance_count(_iso(day))
+        if self.attendance_store is not None:
+            return self.attendance_store.count_on(day)
+        return len(self._attendance_index().get(_ordinal(day), ()))
 
+    @_indexed
+    def attendees_on(self, day):
+        if self.storage is not None:
+            return set(self.storage.attendees_on(_iso(day)))
+        if self.attendance_store is not None:
+            return self.attendance_store.members_on(day)
+        return set(self._attendance_index().get(_ordinal(day), ()))
+
+    @_indexed
+    def attendance_counts(self, days):
+        if self.attendance_store is not None:
+            days = [_ordinal(day) for day in days]
+            if not days:
+                return []
+            first = min(days)
+            counts = self.attendance_store.counts_per_day(date.fromordinal(first), date.fromordinal(max(days)))
+            return [int(counts[day - first]) for day in days]
+        return [self.attendance_count(day) for day in days]
+
+    # --- Date ranges ---
+    # Built on the members' sorted logs; results come back in date order.
+    @_shared
+    def attendance_between(self, start, end):
+        # [(member_id, date)] for every check-in from start to end inclusive
+        if self.storage is not None:
+            return [(member_id, _as_date(day))
+                    for member_id, day in self.storage.attendance_between(_iso(start), _iso(end))]
+        if self.attendance_store is not None:
+            return [(member_id, date.fromordinal(day))
+                    for member_id, day in self.attendance_store.entries_between(start, end)]
+        found = [(member.member_id, day) for member in self.members.values()
+                 for day in member.attendance_between(start, end)]
+        found.sort(key=itemgetter(1))
+        return found
+
+    @_shared
+    def payments_between(self, start, end):
+        # [(member_id, Payment)] for every payment from start to end inclusive
+        if self.storage is not None:
+            return [(member_id, Payment(_as_date(day), amount))
+                    for member_id, day, amount in self.storage.payments_between(_iso(start), _iso(end))]
+        found = [(member.member_id, payment) for member in self.members.values()
+                 for payment in member.payments_between(start, end)]
+        found.sort(key=lambda item: item[1].date)
+        return found
+
+    def revenue_between(self, start, end):
+        return sum(payment.amount for _, payment in self.payments_between(start, end))
+
+    @_indexed
+    def top_attendees(self, days, limit=5):
+        visits = {}
+        for day in days:
+            for member_id in self.attendees_on(day):
+                visits[member_id] = visits.get(member_id, 0) + 1
+        ranked = sorted(visits.items(), key=lambda item: item[1], reverse=True)[:limit]
+        # Fewer active members than `limit`: fill up with members who did
+        # not come, in join order, so the list is as long as asked for
+        for member_id in self.members:
+            if len(ranked) >= limit:
+                break
+            if member_id not in visits:
+                ranked.append((member_id, 0))
+        return [(self.members[member_id], count) for member_id, count in ranked]
+
+    @_indexed
+    def members_visited_at_least(self, times, days=90, today=None):
+        # [(member, days visited)] for members who came in on at least
+        # `times` of the last `days` days, most regular first
+        today = _as_date(today) if today else date.today()
+        start = today - timedelta(days - 1)
+        times = max(times, 1)
+        if self.bitmap is not None:
+            counts = self.bitmap.visit_counts(start, today)
+            rows = np.flatnonzero(counts >= times)
+            rows = rows[np.argsort(-counts[rows], kind="stable")]
+            member_ids = self.bitmap.member_ids
+            return [(self.members[member_ids[row]], count)
+                    for row, count in zip(rows.tolist(), counts[rows].tolist())]
+        if self.attendance_store is not None:
+            visits = self.attendance_store.counts_per_member(start, today).items()
+        else:
+            visits = ((member_id, len(set(member.attendance_between(start, today))))
+                      for member_id, member in self.members.items())
+        found = [(self.members[member_id], count) for member_id, count in visits if count >= times]
+        found.sort(key=itemgetter(1), reverse=True)
+        return found
+
+    @_indexed
+    def attendance_heatmap(self, start, end, member_id=None):
+        # [(date, members in)] for every day from start to end inclusive, or
+        # [(date, 1 or 0)] for one member when member_id is given
+        start, end = _as_date(start), _as_date(end)
+        days = [start + timedelta(i) for i in range((end - start).days + 1)]
+        if self.bitmap is not None:
+            if member_id is None:
+                counts = self.bitmap.daily_counts(start, end)
+            else:
+                counts = self.bitmap.member_days(member_id, start, end)
+        elif member_id is None:
+            counts = self.attendance_counts(days)
+        else:
+            member = self.members.get(member_id)
+            visited = set(member.attendance_days()) if member is not None else set()
+            counts = [day.toordinal() in visited for day in days]
+        return [(day, int(count)) for day, count in zip(days, counts)]
+
+    @_shared
+    def members_on_plan(self, plan_id):
+        if self.storage is not None:
+            member_ids = self.storage.plan_member_ids(plan_id)
+        else:
+            member_ids = list(self._members_by_plan.get(plan_id, ()))
+        return [self.members[member_id] for member_id in member_ids]
+
+    @_shared
+    def plan_counts(self):
+        if self.storage is not None:
+            counts = self.storage.plan_counts()
+        else:
+            counts = {pid: len(ids) for pid, ids in self._members_by_plan.items()}
+        return {pid: counts.get(pid, 0) for pid in self.workout_plans}
+
+    @_shared
+    def most_popular_plan(self):
+        counts = self.plan_counts()
+        if not counts or max(counts.values()) == 0:
+            return None
+        return max(counts, key=counts.get)
+
+    # --- Dashboard statistics ---
+    # Each section is cached against the versions of the parts it reads, so
+    # after a check-in only the attendance figures are recomputed.
+    def _cached(self, section, parts, day, compute):
+        key = tuple(self._part_versions[part] for part in parts) + (day,)
+        hit = self._stats_cache.get(section)
+        if hit is not None and hit[0] == key:
+            return hit[1]
+        value = compute()
+        self._stats_cache[section] = (key, value)
+        return value
+
+    @_indexed
+    def dashboard_stats(self, today=None, chart_days=7):
+        today = today or date.today()
+        days = [today - timedelta(i) for i in range(chart_days-1, -1, -1)]
+        stats = {}
+        stats.update(self._cached("members", ("members",), today, lambda: {
+            "total_members": len(self.members)}))
+        stats.update(self._cached("plans", ("plans", "members"), today, lambda: {
+            "plans": len(self.workout_plans),
+            "popular_plan": self.most_popular_plan()}))
+        stats.update(self._cached("billing", ("payments", "members"), today, lambda: {
+            "paid_this_month": self.billing_counts(today)["paid"],
+            "unpaid_members": self.unpaid_count(today)}))
+        stats.update(self._cached(f"attendance{chart_days}", ("attendance", "members"), today, lambda: {
+            "active_today": self.attendance_count(today),
+            "chart": list(zip(days, self.attendance_counts(days)))}))
+        return stats
+
+    @_indexed
     def get_summary_report(self):
+        if self.storage is not None:
+            return self.storage.summary_report(date.today().isoformat())
         return {
         "total_members": len(self.members),
-        "active_today": sum(1 for m in self.members.values() if date.today().isoformat() in m.attendance_log),
-        "unpaid_members": len(self.get_unpaid_members(date.today().isoformat()))
+        "active_today": self.attendance_count(date.today()),
+        "unpaid_members": self.unpaid_count(date.today())
         }
     
     def on_close(self):
@@ -211,4 +1978,90 @@ class GymManager:
         except Exception:
             pass
     # Destroy the window
-        self.destroy()
\ No newline at end of file
+        self.destroy()
+
+
+class BackgroundSaver:
+    # Writes snapshots of a GymManager on a worker thread. Every change asks
+    # for a save; requests arriving within `delay` seconds of each other are
+    # coalesced into one write. `state` is "saved", "pending", "saving" or
+    # "error" (with the exception in `error`), for a status indicator.
+    def __init__(self, manager, filename="gym_data.json", delay=1.0, compact=False, format=None):
+        self.manager = manager
+        self.filename = filename
+        self.delay = delay
+        self.compact = compact
+        self.format = format or snapshot_format(filename)
+        self.state = "saved"
+        self.error = None
+        self._cond = threading.Condition()
+        self._due = None       # monotonic time the next save may start, None when idle
+        self._requests = 0     # requests so far
+        self._done = 0         # requests covered by a finished save
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="gym-saver", daemon=True)
+        self._thread.start()
+        manager.saver = self
+
+    def request(self, now=False):
+        with self._cond:
+            self._requests += 1
+            self._due = time.monotonic() + (0 if now else self.delay)
+            if self.state != "saving":
+                self.state = "pending"
+            self._cond.notify()
+
+    def flush(self, timeout=None):
+        # Save right away and wait until everything requested so far is on disk
+        with self._cond:
+            if self._done == self._requests and self.state != "error":
+                return True
+            if self.state == "error":
+                self._requests += 1
+            target = self._requests
+            self._due = time.monotonic()
+            self._cond.notify()
+            self._cond.wait_for(lambda: self._done >= target, timeout)
+            return self._done >= target and self.state != "error"
+
+    def stop(self):
+        self.flush()
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join()
+        if self.manager.saver is self:
+            self.manager.saver = None
+
+    def save(self):
+        # One snapshot, written on the calling thread
+        self.manager.save_to_file(self.filename, self.compact, self.format)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._due is None and not self._stopped:
+                    self._cond.wait()
+                if self._due is None:
+                    return
+                # Debounce: wait out the quiet period, which further requests extend
+                while self._due is not None and time.monotonic() < self._due:
+                    self._cond.wait(self._due - time.monotonic())
+                target = self._requests
+                self._due = None
+                self.state = "saving"
+            try:
+                self.save()
+                state, error = "saved", None
+            except Exception as e:
+                state, error = "error", e
+            with self._cond:
+                self._done = target
+                self.error = error
+                self.state = "pending" if self._due is not None and error is None else state
+                self._cond.notify_all()
+
+
+# Opt-in timing of every public operation (PROTRACK_PROFILE=1)
+Instrument.instrument_class(GymManager, skip=("batch", "journal_group"))
+Instrument.instrument_class(BackgroundSaver, names=["save"])
@@ -1,11 +1,15 @@
 from datetime import date
 from Logic import Member,GymManager,WorkoutPlan
-import os
-
-manager = GymManager()
-
-if os.path.exists('gym_data.json'):
-    manager.load_from_file()
+from Storage import open_manager
+from Analytics import analytics_report, format_report
+from Reports import write_report
+import sys
+
+# After `python Storage.py` has migrated gym_data.json, gym_data.db is used instead
+manager = open_manager()
+if manager.storage is not None:
+    print('Gym data has been loaded from gym_data.db!')
+elif manager.members or manager.workout_plans:
     print('Gym data has been loaded successfully!')
 else:
     print('No saved data found. Starting with an empty gym.')
@@ -80,10 +84,25 @@ def log_attendance():
         attendance_date = input('Enter date (YYYY-MM-DD): ')
     print(manager.log_attendance(attendance_date,member_id))
 
+def export_report(kind, **filters):
+    # Rows are streamed to the screen or a file as they are produced
+    path = input('Save to a file (.csv or .jsonl) or leave blank to show here: ').strip()
+    try:
+        count = write_report(manager, kind, path or sys.stdout, **filters)
+    except (ValueError, OSError) as e:
+        print(e)
+        return
+    print(f'{count} rows' + (f' written to {path}.' if path else '.'))
+
 def member_attendance_report():
     print('\n--- Member Attendance Report ---')
-    member_id = input("Enter the Member's ID: ")
-    print(manager.get_member_attendance_report(member_id))
+    member_id = input("Enter the Member's ID: ").strip()
+    if not member_id:
+        print('Please enter a Member ID.')
+        return
+    start = input('Enter the start date or leave blank for all (YYYY-MM-DD): ')
+    end = input('Enter the end date or leave blank for all (YYYY-MM-DD): ')
+    export_report('attendance', member_id=member_id, start=start, end=end)
 
 def record_payment():
     print('\n--- Record Payment ---')
@@ -96,22 +115,27 @@ def record_payment():
     use_today = input("Do you want to use today's date? [Y/N]: ").lower
     if use_today == 'y':
         today = date.today().isoformat()
-        print(manager.members[member_id].add_payment(today,amount))
+        print(manager.add_payment(today,amount,member_id))
     else:
        payment_date = input('Enter date (YYYY-MM-DD): ')
-    print(manager.members[member_id].add_payment(payment_date,amount)) 
+    print(manager.add_payment(payment_date,amount,member_id))
 
 def get_payment_logs():
     print('\n--- Payment Logs ---')
-    print(manager.get_payment_logs())
+    start = input('Enter the start date or leave blank for all (YYYY-MM-DD): ')
+    end = input('Enter the end date or leave blank for all (YYYY-MM-DD): ')
+    plan_id = input('Enter a Plan ID or leave blank for every plan: ')
+    status = input('Only paid or unpaid members? [paid/unpaid, blank for all]: ').strip().lower()
+    cutoff = ''
+    if status:
+        cutoff = input('Enter the due date for membership or leave blank if its today (YYYY-MM-DD): ')
+    export_report('payments', start=start, end=end, plan_id=plan_id, status=status, cutoff=cutoff)
 
 def get_unpaid_members():
     print('\n--- Unpaid Members ---')
     cutoff = input('Enter the due date for membership or leave blank if its today (YYYY-MM-DD): ')
-    if not cutoff:
-        cutoff = date.today().isoformat()
-    unpaid_members = manager.get_unpaid_members(cutoff)
-    print(unpaid_members)
+    plan_id = input('Enter a Plan ID or leave blank for every plan: ')
+    export_report('members', status='unpaid', cutoff=cutoff, plan_id=plan_id)
 
 def view_member_info():
     print('\n--- View Member Info ---')
@@ -122,8 +146,8 @@ def view_member_info():
         print(f"Age: {member.age}")
         print(f"Join Date: {member.join_date}")
         print(f"Workout Plan: {member.workout_plan.name if member.workout_plan else 'None'}")
-        print(f"Attendance Log: {member.attendance_log}")
-        print(f"Payment History: {member.payment_log}")
+        print(f"Attendance Log: {member.get_attendance()}")
+        print(f"Payment History: {[(str(day), amount) for day, amount in member.payment_log]}")
     else:
         print('Member is not found.')
     
@@ -143,8 +167,18 @@ def view_summary_report():
     print(f"Member's active today: {report['active_today']}")
     print(f'Unpaid Members: {report['unpaid_members']}')
 
+def view_analytics_report():
+    print('\n--- Analytics Report ---')
+    try:
+        print(format_report(analytics_report(manager)))
+    except ImportError as e:
+        print(e)
+
 def save_data():
-    manager.save_to_file()
+    if manager.storage is not None:
+        manager.flush()
+    else:
+        manager.save_to_file()
     print('Data successfully saved.')
 
 def menu():
@@ -166,6 +200,7 @@ def menu():
         print("14. View Summary Report")
         print("15. Save Data")
         print("16. Exit")
+        print("17. View Analytics Report")
 
         choice = input("Choose an option: ").strip()
 
@@ -202,6 +237,8 @@ def menu():
         elif choice == "16":
             print("👋 Exiting program. Goodbye!")
             break
+        elif choice == "17":
+            view_analytics_report()
         else:
             print("❌ Invalid option. Try again.")
 
@@ -0,0 +1,189 @@
+import argparse
+import csv
+import functools
+import json
+import sys
+from datetime import date
+from itertools import count
+from operator import itemgetter
+
+REPORT_PAGE = 1000   # members read per lock, see _paged
+
+# Columns of each report, in file order
+REPORTS = {
+    "attendance": ("member_id", "name", "date"),
+    "payments": ("member_id", "name", "plan_id", "date", "amount"),
+    "members": ("member_id", "name", "plan_id", "join_date", "last_payment", "status"),
+}
+FORMATS = ("csv", "jsonl")
+STATUSES = ("paid", "unpaid")
+
+
+def _day(value, label):
+    if value is None or value == "" or isinstance(value, date):
+        return value or None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{label} {value!r} is not a valid date (YYYY-MM-DD).") from None
+
+
+@functools.lru_cache(maxsize=8192)
+def _iso(day):
+    # Rows repeat the same few hundred days, so each is formatted once
+    return day.isoformat()
+
+
+def _plan_id(member):
+    return member.workout_plan.plan_id if member.workout_plan else ""
+
+
+def _status(member, cutoff):
+    # Same rule as GymManager.get_unpaid_members: paid means the latest
+    # payment falls on or after the cutoff
+    last = member.last_payment()
+    return "paid" if last is not None and last.date >= cutoff else "unpaid"
+
+
+def _paged(manager, plan_id, status, cutoff):
+    # One page of members at a time, so the shared lock is only held briefly
+    # and nothing but the current page is in memory
+    offset = 0
+    while True:
+        page = manager.member_page(offset, REPORT_PAGE)
+        if not page:
+            return
+        offset += len(page)
+        for member in page:
+            if plan_id and _plan_id(member) != plan_id:
+                continue
+            if status and _status(member, cutoff) != status:
+                continue
+            yield member
+
+
+def _members(manager, member_id=None, plan_id=None, status=None, cutoff=None):
+    # Checks the filters up front, so a bad one fails before any row is written
+    if status not in (None, "") + STATUSES:
+        raise ValueError(f"Status must be one of {', '.join(STATUSES)}.")
+    if plan_id and plan_id not in manager.workout_plans:
+        raise ValueError(f"Plan ID {plan_id} was not found.")
+    if member_id:
+        member = manager.get_members_info(member_id)
+        if member is None:
+            raise ValueError(f"Member ID {member_id} was not found.")
+        return iter([member])
+    return _paged(manager, plan_id, status, cutoff)
+
+
+# --- Reports ---
+# Each returns a lazy iterator of row tuples (see REPORTS for the columns),
+# with dates as YYYY-MM-DD strings so rows can be written out as they are.
+# Rows come member by member in join order, and by date within a member.
+# Every report takes the same member filters: member_id, plan_id and a
+# payment status ("paid"/"unpaid") as of `cutoff` (default today).
+def attendance_rows(manager, start=None, end=None, member_id=None, plan_id=None, status=None, cutoff=None):
+    start, end = _day(start, "Start date") or date.min, _day(end, "End date") or date.max
+    cutoff = _day(cutoff, "Cutoff date") or date.today()
+    members = _members(manager, member_id, plan_id, status, cutoff)
+    return ((member.member_id, member.name, _iso(day))
+            for member in members for day in member.attendance_between(start, end))
+
+
+def payment_rows(manager, start=None, end=None, member_id=None, plan_id=None, status=None, cutoff=None):
+    start, end = _day(start, "Start date") or date.min, _day(end, "End date") or date.max
+    cutoff = _day(cutoff, "Cutoff date") or date.today()
+    members = _members(manager, member_id, plan_id, status, cutoff)
+    return ((member.member_id, member.name, _plan_id(member), _iso(payment.date), payment.amount)
+            for member in members for payment in member.payments_between(start, end))
+
+
+def _member_row(member, cutoff):
+    last = member.last_payment()
+    return (member.member_id, member.name, _plan_id(member), _iso(member.join_date),
+            _iso(last.date) if last else "", _status(member, cutoff))
+
+
+def member_rows(manager, member_id=None, plan_id=None, status=None, cutoff=None):
+    cutoff = _day(cutoff, "Cutoff date") or date.today()
+    members = _members(manager, member_id, plan_id, status, cutoff)
+    return (_member_row(member, cutoff) for member in members)
+
+
+ROWS = {"attendance": attendance_rows, "payments": payment_rows, "members": member_rows}
+
+
+def _counted(rows, counter):
+    # Passes rows through while `counter` counts them: zip takes a row
+    # before a number, so next(counter) afterwards is the row count
+    return map(itemgetter(0), zip(rows, counter))
+
+
+def write_csv(rows, fields, out):
+    writer = csv.writer(out)
+    writer.writerow(fields)
+    counter = count()
+    writer.writerows(_counted(rows, counter))
+    return next(counter)
+
+
+def write_jsonl(rows, fields, out):
+    encode = json.JSONEncoder().encode
+    counter = count()
+    for row in _counted(rows, counter):
+        out.write(encode(dict(zip(fields, row))) + "\n")
+    return next(counter)
+
+
+def write_report(manager, kind, out, format=None, **filters):
+    # Streams report `kind` to `out` (a path, "-" for stdout, or an open text
+    # file) as CSV or JSON lines and returns the number of rows. The format
+    # defaults to the file's extension: .jsonl/.json for JSON lines, else CSV.
+    if kind not in ROWS:
+        raise ValueError(f"Report must be one of {', '.join(ROWS)}.")
+    if format is None:
+        format = "jsonl" if isinstance(out, str) and out.endswith((".jsonl", ".json")) else "csv"
+    if format not in FORMATS:
+        raise ValueError(f"Format must be one of {', '.join(FORMATS)}.")
+    rows = ROWS[kind](manager, **filters)
+    write = write_csv if format == "csv" else write_jsonl
+    if not isinstance(out, str):
+        return write(rows, REPORTS[kind], out)
+    if out == "-":
+        return write(rows, REPORTS[kind], sys.stdout)
+    with open(out, "w", newline="") as f:
+        return write(rows, REPORTS[kind], f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream ProTrack GMS reports as CSV or JSON lines.")
+    parser.add_argument("kind", choices=REPORTS)
+    parser.add_argument("out", nargs="?", default="-", help="output file, or - for stdout")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the output file's extension")
+    parser.add_argument("--start", help="first date, YYYY-MM-DD (attendance/payments)")
+    parser.add_argument("--end", help="last date, YYYY-MM-DD (attendance/payments)")
+    parser.add_argument("--member", help="only this member")
+    parser.add_argument("--plan", help="only members on this plan")
+    parser.add_argument("--status", choices=STATUSES, help="only paid or unpaid members")
+    parser.add_argument("--cutoff", help="date the payment status is taken at (default today)")
+    parser.add_argument("--data", default="gym_data.json", help="JSON data file (default: %(default)s)")
+    parser.add_argument("--db", default="gym_data.db", help="SQLite file, used instead when it exists")
+    args = parser.parse_args(argv)
+
+    from Storage import open_manager
+    manager = open_manager(args.data, args.db)
+    filters = {"member_id": args.member, "plan_id": args.plan, "status": args.status, "cutoff": args.cutoff}
+    if args.kind != "members":
+        filters.update(start=args.start, end=args.end)
+    try:
+        count = write_report(manager, args.kind, args.out, args.format, **filters)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if args.out != "-":
+        print(f"Wrote {count} rows to {args.out}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,333 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from Logic import GymManager, journal_path
+from Storage import open_manager
+
+DATA_FILE = "gym_data.json"
+DB_FILE = "gym_data.db"
+HOST = "127.0.0.1"
+PORT = 8765
+MAX_QUEUE = 10000      # check-ins waiting for the batcher, across all kiosks
+MAX_BATCH = 1000       # check-ins applied (and journaled) as one group
+MAX_IN_FLIGHT = 256    # unanswered requests per connection before we stop reading it
+BUSY_TIMEOUT = 0.5     # seconds a request waits for room in the queue before BUSY
+SAVE_DELAY = 30.0      # the journal carries the rush; snapshots can wait
+
+# Line protocol, one request per line, one reply line per request in order:
+#   CHECKIN <member_id> [YYYY-MM-DD]          -> OK <message> | ERR <reason> | BUSY
+#   PAY <member_id> <amount> [YYYY-MM-DD]     -> OK <message> | ERR <reason> | BUSY
+#   MEMBERS [limit]                           -> OK <member_id> <member_id> ...
+#   STATS                                     -> OK {"applied": ..., ...}
+#   QUIT
+# BUSY means the server is saturated: retry later.
+
+
+def _parse_request(line):
+    # -> (command, args); raises ValueError for a malformed request
+    parts = line.split()
+    if not parts:
+        raise ValueError("empty request")
+    command, args = parts[0].upper(), parts[1:]
+    if command == "CHECKIN" and len(args) in (1, 2):
+        day = date.fromisoformat(args[1]) if len(args) == 2 else None
+        return command, (args[0], day)
+    if command == "PAY" and len(args) in (2, 3):
+        amount = float(args[1])
+        if amount <= 0:
+            raise ValueError(f"amount must be positive, got {amount}")
+        day = date.fromisoformat(args[2]) if len(args) == 3 else None
+        return command, (args[0], amount, day)
+    if command == "MEMBERS" and len(args) <= 1:
+        return command, (int(args[0]) if args else 100,)
+    if command in ("STATS", "QUIT") and not args:
+        return command, ()
+    raise ValueError(f"bad request {line.strip()!r}")
+
+
+class CheckInServer:
+    # Many kiosks, one GymManager. Requests from every connection go into one
+    # bounded queue; a single batcher takes whatever has queued up and applies
+    # it in a worker thread as one journal_group, so the whole batch costs one
+    # journal write. Under load batches grow by themselves while the previous
+    # one is being applied. Nothing that takes the manager's lock runs on the
+    # event loop, so a slow batch never stalls the connections.
+    def __init__(self, manager, max_queue=MAX_QUEUE, max_batch=MAX_BATCH,
+                 max_in_flight=MAX_IN_FLIGHT, busy_timeout=BUSY_TIMEOUT):
+        self.manager = manager
+        self.max_batch = max_batch
+        self.max_in_flight = max_in_flight
+        self.busy_timeout = busy_timeout
+        self.stats = Counter()   # applied, failed, busy, batches, connections
+        self._queue = asyncio.Queue(max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gym-batch")
+        self._server = None
+        self._batcher = None
+        self._writers = set()    # open connections, closed on stop()
+
+    async def start(self, host=HOST, port=PORT):
+        self._batcher = asyncio.create_task(self._run_batches())
+        self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        # Stop accepting, finish what is queued, then make it durable
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        await self._server.wait_closed()
+        await self._queue.join()
+        self._batcher.cancel()
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.manager.flush)
+        self._executor.shutdown()
+
+    async def serve_forever(self, host=HOST, port=PORT):
+        host, port = await self.start(host, port)
+        print(f"Check-in server listening on {host}:{port}", file=sys.stderr)
+        try:
+            await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await self.stop()
+
+    async def _serve(self, reader, writer):
+        self.stats["connections"] += 1
+        self._writers.add(writer)
+        replies = asyncio.Queue(self.max_in_flight)   # futures, in request order
+        sender = asyncio.create_task(self._send_replies(replies, writer))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                reply = await self._submit(line.decode("utf-8", "replace"))
+                if reply is None:
+                    break
+                # Blocks once max_in_flight replies are pending, so a client
+                # that outpaces the batcher stops being read
+                await replies.put(reply)
+        except ConnectionError:
+            pass
+        finally:
+            await replies.put(None)
+            await sender
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _send_replies(self, replies, writer):
+        while True:
+            reply = await replies.get()
+            if reply is None:
+                return
+            try:
+                writer.write((await reply + "\n").encode())
+                if replies.empty():
+                    await writer.drain()
+            except ConnectionError:
+                pass
+
+    async def _submit(self, line):
+        # -> future for the reply line, or None for QUIT
+        done = asyncio.get_running_loop().create_future()
+        try:
+            command, args = _parse_request(line)
+        except ValueError as e:
+            done.set_result(f"ERR {e}")
+            return done
+        if command == "QUIT":
+            return None
+        if command == "STATS":
+            done.set_result("OK " + json.dumps(dict(self.stats, queued=self._queue.qsize())))
+        elif command == "MEMBERS":
+            # Reads take the manager's lock too, so they run off the event
+            # loop, in the default executor rather than behind the batches
+            return asyncio.get_running_loop().run_in_executor(None, self._members_reply, args[0])
+        else:
+            try:
+                await asyncio.wait_for(self._queue.put((command, args, done)), self.busy_timeout)
+            except asyncio.TimeoutError:
+                self.stats["busy"] += 1
+                done.set_result("BUSY")
+        return done
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                replies = await loop.run_in_executor(self._executor, self.apply_batch,
+                                                     [(command, args) for command, args, _ in batch])
+            except Exception as e:
+                replies = [f"ERR {e}"] * len(batch)
+            self.stats["batches"] += 1
+            for (_, _, done), reply in zip(batch, replies):
+                self.stats["applied" if reply.startswith("OK") else "failed"] += 1
+                if not done.done():
+                    done.set_result(reply)
+                self._queue.task_done()
+
+    def _members_reply(self, limit):
+        page = self.manager.member_page(0, limit)
+        return "OK " + " ".join(member.member_id for member in page)
+
+    def apply_batch(self, requests):
+        # Worker thread: one group, one journal write, one reply per request
+        replies = []
+        manager = self.manager
+        with manager.journal_group():
+            for command, args in requests:
+                member_id = args[0]
+                if member_id not in manager.members:
+                    replies.append(f"ERR unknown member {member_id}")
+                    continue
+                if command == "CHECKIN":
+                    message = manager.log_attendance(args[1] or date.today(), member_id)
+                else:
+                    message = manager.add_payment(args[2] or date.today(), args[1], member_id)
+                replies.append(f"OK {message}")
+        return replies
+
+
+# --- Load generator ---
+async def _kiosk(host, port, member_ids, until, pipeline, counts, round_trips):
+    # One kiosk: sends `pipeline` check-ins at a time and waits for the replies
+    rng = random.Random()
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.monotonic() < until:
+            writer.write("".join(f"CHECKIN {rng.choice(member_ids)}\n"
+                                 for _ in range(pipeline)).encode())
+            start = time.perf_counter()
+            await writer.drain()
+            for _ in range(pipeline):
+                reply = await reader.readline()
+                counts[reply.split(None, 1)[0].decode() if reply else "closed"] += 1
+            round_trips.append(time.perf_counter() - start)
+        writer.write(b"QUIT\n")
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def _request(host, port, line):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"{line}\nQUIT\n".encode())
+    reply = (await reader.readline()).decode().rstrip("\n")
+    writer.close()
+    return reply
+
+
+async def load_test(host=HOST, port=PORT, clients=20, seconds=5.0, pipeline=16):
+    # Runs `clients` kiosks against a running server for `seconds` and
+    # returns throughput, reply counts and round-trip percentiles
+    member_ids = (await _request(host, port, "MEMBERS 1000")).split()[1:]
+    if not member_ids:
+        raise ValueError("the server has no members to check in")
+    counts, round_trips = Counter(), []
+    start = time.monotonic()
+    await asyncio.gather(*(_kiosk(host, port, member_ids, start + seconds, pipeline, counts, round_trips)
+                           for _ in range(clients)))
+    elapsed = time.monotonic() - start
+    round_trips.sort()
+    server_stats = json.loads((await _request(host, port, "STATS"))[3:])
+    return {
+        "clients": clients,
+        "pipeline": pipeline,
+        "seconds": elapsed,
+        "replies": dict(counts),
+        "checkins_per_second": counts["OK"] / elapsed,
+        "round_trip_p50_ms": round_trips[len(round_trips) // 2] * 1000 if round_trips else None,
+        "round_trip_p95_ms": round_trips[int(len(round_trips) * 0.95)] * 1000 if round_trips else None,
+        "average_batch": server_stats.get("applied", 0) / max(server_stats.get("batches", 0), 1),
+    }
+
+
+def format_load_test(result):
+    return (f"{result['clients']} kiosks x {result['pipeline']} pipelined, {result['seconds']:.1f} s\n"
+            f"  replies:      {result['replies']}\n"
+            f"  check-ins/s:  {result['checkins_per_second']:,.0f}\n"
+            f"  round trip:   p50 {result['round_trip_p50_ms']:.1f} ms, p95 {result['round_trip_p95_ms']:.1f} ms\n"
+            f"  server batch: {result['average_batch']:.1f} check-ins on average")
+
+
+async def _demo(members, clients, seconds, pipeline):
+    # Everything on localhost: a synthetic gym in a temporary directory, the
+    # server on a free port and the kiosks in the same event loop
+    from Synthetic import generate_gym
+    with tempfile.TemporaryDirectory() as workdir:
+        data_file = os.path.join(workdir, DATA_FILE)
+        gym = generate_gym(members)
+        before = sum(len(member.attendance_days()) for member in gym.members.values())
+        gym.save_to_file(data_file)
+        manager = open_manager(data_file, db_file=None, journal=True, save_delay=SAVE_DELAY)
+        server = CheckInServer(manager)
+        host, port = await server.start(HOST, 0)
+        result = await load_test(host, port, clients, seconds, pipeline)
+        await server.stop()
+        manager.saver.stop()
+        manager.close_journal()
+        check = GymManager()
+        check.load_from_file(data_file)
+        result["journal_bytes"] = (os.path.getsize(journal_path(data_file))
+                                   if os.path.exists(journal_path(data_file)) else 0)
+        result["saved_checkins"] = sum(len(m.attendance_days()) for m in check.members.values()) - before
+        return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local check-in server for ProTrack GMS kiosks.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="accept check-ins from kiosks")
+    serve.add_argument("--host", default=HOST)
+    serve.add_argument("--port", type=int, default=PORT)
+    serve.add_argument("--data", default=DATA_FILE, help="snapshot file (default: %(default)s)")
+    serve.add_argument("--db", default=DB_FILE, help="SQLite file, used instead when it exists")
+    for name, help_text in (("loadgen", "drive a running server with simulated kiosks"),
+                            ("demo", "start a server on a synthetic gym and load test it")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--clients", type=int, default=20)
+        p.add_argument("--seconds", type=float, default=5.0)
+        p.add_argument("--pipeline", type=int, default=16, help="check-ins in flight per kiosk")
+        if name == "loadgen":
+            p.add_argument("--host", default=HOST)
+            p.add_argument("--port", type=int, default=PORT)
+        else:
+            p.add_argument("--members", type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        manager = open_manager(args.data, args.db, journal=True, save_delay=SAVE_DELAY)
+        try:
+            asyncio.run(CheckInServer(manager).serve_forever(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if manager.saver is not None:
+                manager.saver.stop()
+            manager.close_journal()
+        return 0
+    if args.command == "loadgen":
+        result = asyncio.run(load_test(args.host, args.port, args.clients, args.seconds, args.pipeline))
+    else:
+        result = asyncio.run(_demo(args.members, args.clients, args.seconds, args.pipeline))
+    print(format_load_test(result))
+    if "saved_checkins" in result:
+        print(f"  on disk:      {result['saved_checkins']:,} new check-ins after reload "
+              f"(journal {result['journal_bytes']:,} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
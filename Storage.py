@@ -0,0 +1,418 @@
+import json
+import os
+import sqlite3
+import sys
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+from Logic import BackgroundSaver, GymManager, Member, WorkoutPlan, _search_keys
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    plan_id    TEXT PRIMARY KEY,
+    name       TEXT,
+    focus_area TEXT,
+    exercises  TEXT
+);
+CREATE TABLE IF NOT EXISTS members (
+    member_id TEXT PRIMARY KEY,
+    name      TEXT,
+    age       INTEGER,
+    join_date TEXT,
+    plan_id   TEXT
+);
+CREATE TABLE IF NOT EXISTS attendance (
+    member_id TEXT NOT NULL,
+    date      TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS payments (
+    member_id TEXT NOT NULL,
+    date      TEXT NOT NULL,
+    amount    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attendance_member_date ON attendance(member_id, date);
+CREATE INDEX IF NOT EXISTS attendance_date ON attendance(date);
+CREATE INDEX IF NOT EXISTS payments_member_date ON payments(member_id, date);
+CREATE INDEX IF NOT EXISTS payments_date ON payments(date);
+CREATE INDEX IF NOT EXISTS members_plan ON members(plan_id);
+"""
+
+# Latest payment date per member; members with no payment get NULL.
+LAST_PAID = """
+SELECT m.member_id, MAX(p.date) AS last_paid
+FROM members m LEFT JOIN payments p ON p.member_id = m.member_id
+GROUP BY m.member_id
+"""
+
+
+class StorageBackend(ABC):
+    """Interface a GymManager uses when its data lives outside of memory.
+
+    Changes reach the backend through apply(), with the same op/field
+    records the journal writes, so a backend never has to know about the
+    GymManager methods that produced them.
+    """
+
+    @abstractmethod
+    def load_member(self, member_id, workout_plans):
+        raise NotImplementedError
+
+    @abstractmethod
+    def has_member(self, member_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def count_members(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def member_ids(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def load_plans(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def member_view(self, workout_plans):
+        raise NotImplementedError
+
+    @abstractmethod
+    def apply(self, op, fields):
+        raise NotImplementedError
+
+    @abstractmethod
+    def unpaid_member_ids(self, cutoff_date):
+        raise NotImplementedError
+
+    @abstractmethod
+    def member_ids_page(self, offset, limit):
+        raise NotImplementedError
+
+    @abstractmethod
+    def search_member_ids(self, query, limit):
+        raise NotImplementedError
+
+    @abstractmethod
+    def summary_report(self, today):
+        raise NotImplementedError
+
+    @abstractmethod
+    def attendance_dates(self, member_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def attendance_count(self, day):
+        raise NotImplementedError
+
+    @abstractmethod
+    def attendees_on(self, day):
+        raise NotImplementedError
+
+    @abstractmethod
+    def plan_member_ids(self, plan_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def attendance_between(self, start, end):
+        raise NotImplementedError
+
+    @abstractmethod
+    def payments_between(self, start, end):
+        raise NotImplementedError
+
+    @abstractmethod
+    def last_payment_date(self, member_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def paid_count(self, start, end):
+        raise NotImplementedError
+
+    @abstractmethod
+    def plan_counts(self):
+        raise NotImplementedError
+
+    def begin(self):
+        # Start a batch: apply() stops committing until commit()
+        pass
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class LazyMembers(MutableMapping):
+    # member_id -> Member view over a backend. Members are built on first
+    # access and kept in a bounded cache; writes reach the backend through
+    # GymManager's change records, so assigning here only caches.
+    def __init__(self, storage, workout_plans, cache_size=4096):
+        self._storage = storage
+        self._plans = workout_plans
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+
+    def __getitem__(self, member_id):
+        if member_id in self._cache:
+            self._cache.move_to_end(member_id)
+            return self._cache[member_id]
+        member = self._storage.load_member(member_id, self._plans)
+        if member is None:
+            raise KeyError(member_id)
+        self[member_id] = member
+        return member
+
+    def __setitem__(self, member_id, member):
+        self._cache[member_id] = member
+        self._cache.move_to_end(member_id)
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def __delitem__(self, member_id):
+        if member_id not in self:
+            raise KeyError(member_id)
+        self._cache.pop(member_id, None)
+
+    def __contains__(self, member_id):
+        return member_id in self._cache or self._storage.has_member(member_id)
+
+    def __iter__(self):
+        return iter(self._storage.member_ids())
+
+    def __len__(self):
+        return self._storage.count_members()
+
+
+def _search_order(member_id, name, query):
+    # Sort key of a member in GymManager.search_members' order: its first
+    # search key list and key that start with `query`, as one string (the
+    # list number is one digit), or None when none does
+    keys = [(rank, key) for rank, key in _search_keys(member_id, name) if key.startswith(query)]
+    if not keys:
+        return None
+    rank, key = min(keys)
+    return f"{rank}{key}"
+
+
+class SqliteStorage(StorageBackend):
+    def __init__(self, path="gym_data.db"):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)   # GymManager serializes access
+        self.conn.executescript(SCHEMA)
+        self.conn.create_function("search_order", 3, _search_order, deterministic=True)
+        self.in_batch = False
+
+    # --- Reads ---
+    def load_plans(self):
+        plans = {}
+        for plan_id, name, focus, exercises in self.conn.execute(
+                "SELECT plan_id, name, focus_area, exercises FROM plans"):
+            plans[plan_id] = WorkoutPlan(plan_id, name, focus, json.loads(exercises))
+        return plans
+
+    def member_view(self, workout_plans):
+        return LazyMembers(self, workout_plans)
+
+    def has_member(self, member_id):
+        row = self.conn.execute("SELECT 1 FROM members WHERE member_id = ?",
+                                (member_id,)).fetchone()
+        return row is not None
+
+    def member_ids(self):
+        return [row[0] for row in self.conn.execute("SELECT member_id FROM members")]
+
+    def count_members(self):
+        return self.conn.execute("SELECT COUNT(*) FROM members").fetchone()[0]
+
+    def member_ids_page(self, offset, limit):
+        return [row[0] for row in self.conn.execute(
+            "SELECT member_id FROM members ORDER BY rowid LIMIT ? OFFSET ?", (limit, offset))]
+
+    def search_member_ids(self, query, limit):
+        # Same matching and ranking as GymManager.search_members: LIKE picks
+        # the candidates, search_order puts them in the in-memory order
+        prefix = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return [row[0] for row in self.conn.execute(
+            "SELECT member_id FROM members "
+            "WHERE (member_id LIKE :p ESCAPE '\\' OR name LIKE :p ESCAPE '\\' OR name LIKE :w ESCAPE '\\') "
+            "AND search_order(member_id, name, :q) IS NOT NULL "
+            "ORDER BY search_order(member_id, name, :q), member_id LIMIT :n",
+            {"p": prefix, "w": "% " + prefix, "q": query, "n": limit})]
+
+    def load_member(self, member_id, workout_plans):
+        row = self.conn.execute(
+            "SELECT member_id, name, age, join_date, plan_id FROM members WHERE member_id = ?",
+            (member_id,)).fetchone()
+        if row is None:
+            return None
+        payments = self.conn.execute(
+            "SELECT date, amount FROM payments WHERE member_id = ? ORDER BY rowid",
+            (member_id,)).fetchall()
+        return Member.from_dict({
+            "member_id": row[0],
+            "name": row[1],
+            "age": row[2],
+            "join_date": row[3],
+            "workout_plan_id": row[4],
+            "payment_history": payments,
+            "attendance_log": self.attendance_dates(member_id),
+        }, workout_plans)
+
+    def attendance_dates(self, member_id):
+        return [row[0] for row in self.conn.execute(
+            "SELECT date FROM attendance WHERE member_id = ? ORDER BY rowid", (member_id,))]
+
+    def attendance_count(self, day):
+        return self.conn.execute(
+            "SELECT COUNT(DISTINCT member_id) FROM attendance WHERE date = ?",
+            (day,)).fetchone()[0]
+
+    def attendees_on(self, day):
+        return [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT member_id FROM attendance WHERE date = ?", (day,))]
+
+    def attendance_between(self, start, end):
+        return self.conn.execute(
+            "SELECT member_id, date FROM attendance WHERE date BETWEEN ? AND ? ORDER BY date, rowid",
+            (start, end)).fetchall()
+
+    def payments_between(self, start, end):
+        return self.conn.execute(
+            "SELECT member_id, date, amount FROM payments WHERE date BETWEEN ? AND ? ORDER BY date, rowid",
+            (start, end)).fetchall()
+
+    def plan_member_ids(self, plan_id):
+        return [row[0] for row in self.conn.execute(
+            "SELECT member_id FROM members WHERE plan_id = ?", (plan_id,))]
+
+    def plan_counts(self):
+        return dict(self.conn.execute(
+            "SELECT plan_id, COUNT(*) FROM members WHERE plan_id IS NOT NULL GROUP BY plan_id"))
+
+    def last_payment_date(self, member_id):
+        return self.conn.execute("SELECT MAX(date) FROM payments WHERE member_id = ?",
+                                 (member_id,)).fetchone()[0]
+
+    def paid_count(self, start, end):
+        return self.conn.execute(
+            f"SELECT COUNT(*) FROM ({LAST_PAID}) WHERE last_paid >= ? AND last_paid < ?",
+            (start, end)).fetchone()[0]
+
+    def unpaid_member_ids(self, cutoff_date):
+        return [row[0] for row in self.conn.execute(
+            f"SELECT member_id FROM ({LAST_PAID}) WHERE last_paid IS NULL OR last_paid < ?",
+            (cutoff_date,))]
+
+    def summary_report(self, today):
+        active = self.attendance_count(today)
+        unpaid = self.conn.execute(
+            f"SELECT COUNT(*) FROM ({LAST_PAID}) WHERE last_paid IS NULL OR last_paid < ?",
+            (today,)).fetchone()[0]
+        return {
+            "total_members": self.count_members(),
+            "active_today": active,
+            "unpaid_members": unpaid
+        }
+
+    # --- Writes ---
+    def apply(self, op, fields):
+        if self.in_batch:
+            self._apply(op, fields)
+            return
+        with self.conn:
+            self._apply(op, fields)
+
+    def _apply(self, op, fields):
+        c = self.conn
+        if op == "register":
+            self._insert_member(fields["member"])
+        elif op == "remove_member":
+            for table in ("members", "attendance", "payments"):
+                c.execute(f"DELETE FROM {table} WHERE member_id = ?", (fields["member_id"],))
+        elif op == "add_plan":
+            self._insert_plan(fields["plan"])
+        elif op == "remove_plan":
+            c.execute("UPDATE members SET plan_id = NULL WHERE plan_id = ?", (fields["plan_id"],))
+            c.execute("DELETE FROM plans WHERE plan_id = ?", (fields["plan_id"],))
+        elif op == "assign":
+            c.execute("UPDATE members SET plan_id = ? WHERE member_id = ?",
+                      (fields["plan_id"], fields["member_id"]))
+        elif op == "unassign":
+            c.execute("UPDATE members SET plan_id = NULL WHERE member_id = ?", (fields["member_id"],))
+        elif op == "attend":
+            c.execute("INSERT INTO attendance (member_id, date) VALUES (?, ?)",
+                      (fields["member_id"], fields["date"]))
+        elif op == "pay":
+            c.execute("INSERT INTO payments (member_id, date, amount) VALUES (?, ?, ?)",
+                      (fields["member_id"], fields["date"], fields["amount"]))
+
+    def _insert_plan(self, data):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO plans (plan_id, name, focus_area, exercises) VALUES (?, ?, ?, ?)",
+            (data["plan_id"], data["name"], data["focus_area"], json.dumps(data["exercises"])))
+
+    def _insert_member(self, data):
+        member_id = data["member_id"]
+        self.conn.execute(
+            "INSERT OR REPLACE INTO members (member_id, name, age, join_date, plan_id) VALUES (?, ?, ?, ?, ?)",
+            (member_id, data["name"], data["age"], data["join_date"], data["workout_plan_id"]))
+        self.conn.executemany("INSERT INTO attendance (member_id, date) VALUES (?, ?)",
+                              ((member_id, d) for d in data["attendance_log"]))
+        self.conn.executemany("INSERT INTO payments (member_id, date, amount) VALUES (?, ?, ?)",
+                              ((member_id, d, amt) for d, amt in data["payment_history"]))
+
+    def import_manager(self, manager):
+        with self.conn:
+            for plan in manager.workout_plans.values():
+                self._insert_plan(plan.to_dict())
+            for member in manager.members.values():
+                self._insert_member(member.to_dict())
+
+    def begin(self):
+        self.in_batch = True
+
+    def commit(self):
+        self.conn.commit()
+        self.in_batch = False
+
+    def close(self):
+        self.conn.close()
+
+
+def migrate_json(json_file="gym_data.json", db_file="gym_data.db"):
+    # One-shot copy of a save_to_file snapshot (plus any journal) into SQLite
+    source = GymManager()
+    source.load_from_file(json_file)
+    storage = SqliteStorage(db_file)
+    if storage.count_members() or storage.load_plans():
+        storage.close()
+        return f'{db_file} already holds data; migration skipped.'
+    storage.import_manager(source)
+    storage.close()
+    return f'Migrated {len(source.members)} members and {len(source.workout_plans)} plans to {db_file}.'
+
+
+def open_manager(data_file="gym_data.json", db_file="gym_data.db", journal=False, save_delay=None,
+                 manager=None):
+    # The gym every app works on: the SQLite file once migrated (see
+    # migrate_json), else the snapshot plus its journal, or an empty gym.
+    # With a snapshot, journal=True appends each change to its journal and
+    # save_delay starts a BackgroundSaver with that delay. `manager` is an
+    # empty GymManager to load the snapshot into, for a caller watching it fill.
+    if db_file and os.path.exists(db_file):
+        return GymManager(storage=SqliteStorage(db_file))
+    manager = manager if manager is not None else GymManager()
+    manager.load_from_file(data_file)
+    if journal:
+        manager.open_journal(data_file)
+    if save_delay is not None:
+        BackgroundSaver(manager, data_file, delay=save_delay)
+    return manager
+
+
+if __name__ == "__main__":
+    # python Storage.py [gym_data.json] [gym_data.db]
+    print(migrate_json(*sys.argv[1:3]))
@@ -0,0 +1,250 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from Logic import BackgroundSaver, GymManager, Member
+from Synthetic import generate_gym
+
+
+class Failures:
+    # Collects invariant violations and exceptions from every thread
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.messages = []
+
+    def add(self, message):
+        with self.lock:
+            if len(self.messages) < 50:
+                self.messages.append(message)
+
+
+def _appender(manager, member_ids, until, seed, done, failures):
+    # Check-ins and payments on existing members; `done` counts them per member
+    # Half the time one of a few hot members, so threads collide on them
+    rng = random.Random(seed)
+    today = date.today()
+    hot = member_ids[:8]
+    while time.monotonic() < until:
+        member_id = rng.choice(hot if rng.random() < 0.5 else member_ids)
+        day = today - timedelta(days=rng.randrange(60))
+        try:
+            if rng.random() < 0.6:
+                message = manager.log_attendance(day, member_id)
+                kind = "attend"
+            else:
+                message = manager.add_payment(day, 100.0, member_id)
+                kind = "pay"
+        except Exception as e:
+            failures.add(f"{kind} {member_id}: {e!r}")
+            continue
+        if "success" not in message:
+            failures.add(f"{kind} {member_id}: {message}")
+        done[kind, member_id] += 1
+
+
+def _registrar(manager, plan_ids, until, seed, failures):
+    # Joins, leaves and plan changes: the exclusive side of the lock
+    rng = random.Random(seed)
+    mine = []
+    n = changes = 0
+    while time.monotonic() < until:
+        changes += 1
+        try:
+            action = rng.random()
+            if action < 0.4 or not mine:
+                member_id = f"S{seed}-{n}"
+                n += 1
+                manager.register_member(Member(member_id, f"Stress {seed} {n}", 30, date.today()))
+                mine.append(member_id)
+            elif action < 0.6:
+                manager.remove_member(mine.pop(rng.randrange(len(mine))))
+            elif action < 0.8:
+                manager.assign_workoutplan(rng.choice(plan_ids), rng.choice(mine))
+            else:
+                manager.unassign_workoutplan(rng.choice(plan_ids), rng.choice(mine))
+        except Exception as e:
+            failures.add(f"registrar: {e!r}")
+    return changes
+
+
+def _reader(manager, member_ids, until, seed, failures):
+    # Reports must each be consistent with themselves while changes go on
+    rng = random.Random(seed)
+    today = date.today()
+    reads = 0
+    while time.monotonic() < until:
+        try:
+            # Several reads under one lock must agree with each other
+            with manager.lock.read(), manager._state_lock:
+                report = manager.get_summary_report()
+                billing = manager.billing_counts(today)
+                if billing["paid"] + billing["overdue"] != report["total_members"]:
+                    failures.add(f"billing {billing} does not add up to {report['total_members']} members")
+                if report["unpaid_members"] > report["total_members"]:
+                    failures.add(f"more unpaid than members: {report}")
+            stats = manager.dashboard_stats(today)
+            if sum(count for _, count in stats["chart"]) < stats["active_today"]:
+                failures.add(f"chart misses today's check-ins: {stats}")
+            day = today - timedelta(days=rng.randrange(60))
+            manager.top_attendees([day], limit=3)
+            manager.search_members(f"m{rng.randrange(1000):03d}")
+            manager.get_unpaid_members(today)
+            # Per-member reads merge the attendance store's pending check-ins
+            member_id = rng.choice(member_ids[:8] if rng.random() < 0.5 else member_ids)
+            manager.get_member_attendance_report(member_id)
+            manager.members[member_id].attendance_days()
+            reads += 1
+        except Exception as e:
+            failures.add(f"reader: {e!r}")
+    return reads
+
+
+def _saver(manager, path, until, failures):
+    # Snapshots taken while everything else runs
+    saves = 0
+    while time.monotonic() < until:
+        try:
+            manager.save_to_file(path)
+            saves += 1
+        except Exception as e:
+            failures.add(f"save: {e!r}")
+        time.sleep(0.05)
+    return saves
+
+
+def check_indexes(manager, failures):
+    # Every index must match one rebuilt from the members themselves
+    fresh = GymManager()
+    fresh.members, fresh.workout_plans = manager.members, manager.workout_plans
+    fresh._rebuild_indexes()
+    manager._attendance_index()
+    fresh._attendance_index()
+    for name in ("_attendance_by_date", "_members_by_plan", "_last_paid", "_paid_order",
+                 "_never_paid", "_search"):
+        ours, theirs = getattr(manager, name), getattr(fresh, name)
+        if name == "_never_paid":
+            ours, theirs = set(ours), set(theirs)
+        if ours != theirs:
+            failures.add(f"index {name} differs from a rebuild")
+    bitmap = manager.bitmap
+    if bitmap is not None:
+        checkins = 0
+        for member_id, member in manager.members.items():
+            came = bitmap.member_days(member_id, bitmap.epoch, bitmap.epoch + bitmap.days - 1)
+            if set((came.nonzero()[0] + bitmap.epoch).tolist()) != set(member.attendance_days()):
+                failures.add(f"bitmap row of {member_id} differs from its log")
+            checkins += len(member.attendance_days())
+        if checkins != bitmap.checkins or bitmap.seq != manager._seq:
+            failures.add(f"bitmap header ({bitmap.checkins} check-ins, seq {bitmap.seq}) is behind "
+                         f"({checkins}, seq {manager._seq})")
+
+
+def run(members=2000, appenders=4, registrars=2, readers=4, seconds=5.0, seed=0):
+    # Every file of the run lives in a temporary directory removed after it
+    with tempfile.TemporaryDirectory() as workdir:
+        return _run_in(workdir, members, appenders, registrars, readers, seconds, seed)
+
+
+def _run_in(workdir, members, appenders, registrars, readers, seconds, seed):
+    failures = Failures()
+    path = os.path.join(workdir, "stress.json")
+    manager = generate_gym(members, seed=seed)
+    manager.save_to_file(path)
+    manager.open_journal(path, compact_bytes=256 * 1024)   # compactions happen too
+    manager.use_attendance_store()
+    manager.use_attendance_bitmap(path + ".attendance")
+    member_ids = list(manager.members)
+    plan_ids = list(manager.workout_plans)
+    before = {member_id: (len(m.attendance_log), len(m.payment_log)) for member_id, m in manager.members.items()}
+
+    until = time.monotonic() + seconds
+    counts = [Counter() for _ in range(appenders)]
+    results = {}
+    def track(name, fn, *args):
+        results[name] = fn(*args)
+    threads = [threading.Thread(target=_appender, args=(manager, member_ids, until, seed + i, counts[i], failures))
+               for i in range(appenders)]
+    threads += [threading.Thread(target=track, args=(f"registrar{i}", _registrar, manager, plan_ids, until,
+                                                     seed + 100 + i, failures))
+                for i in range(registrars)]
+    threads += [threading.Thread(target=track, args=(f"reader{i}", _reader, manager, member_ids, until,
+                                                   seed + 200 + i, failures))
+                for i in range(readers)]
+    threads.append(threading.Thread(target=track, args=("saves", _saver, manager, path + ".bin", until, failures)))
+    saver = BackgroundSaver(manager, path, delay=0.2)
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    saver.stop()
+
+    # Nobody was starved: writers get their turn between readers and vice versa
+    if appenders and not any(counts):
+        failures.add("no append got through")
+    for name, progress in results.items():
+        if not progress or (name == "saves" and progress < seconds):
+            failures.add(f"{name} only got {progress} rounds in")
+
+    # Every append landed exactly once on its member
+    done = sum(counts, Counter())
+    for member_id, (attended, paid) in before.items():
+        member = manager.members[member_id]
+        if len(member.attendance_log) != attended + done["attend", member_id]:
+            failures.add(f"{member_id}: {len(member.attendance_log)} check-ins, expected "
+                         f"{attended + done['attend', member_id]}")
+        if len(member.payment_log) != paid + done["pay", member_id]:
+            failures.add(f"{member_id}: {len(member.payment_log)} payments, expected "
+                         f"{paid + done['pay', member_id]}")
+    check_indexes(manager, failures)
+
+    # What reached disk (snapshot + journal, and the last binary save) loads back
+    expected = json.dumps(manager.snapshot(), sort_keys=True)
+    manager.close_journal()
+    reloaded = GymManager()
+    reloaded.load_from_file(path)
+    if json.dumps(reloaded.snapshot(), sort_keys=True) != expected:
+        failures.add("snapshot + journal on disk differ from memory")
+    try:
+        GymManager().load_from_file(path + ".bin")
+    except Exception as e:
+        failures.add(f"binary snapshot saved under load does not load: {e!r}")
+
+    return {
+        "appends": sum(done.values()),
+        "reads": sum(v for k, v in results.items() if k.startswith("reader")),
+        "saves": results.get("saves", 0),
+        "members_now": len(manager.members),
+        "failures": failures.messages,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hammer one GymManager from many threads and check its invariants.")
+    parser.add_argument("--members", type=int, default=2000)
+    parser.add_argument("--appenders", type=int, default=4, help="threads logging check-ins and payments")
+    parser.add_argument("--registrars", type=int, default=2, help="threads adding/removing members and plans")
+    parser.add_argument("--readers", type=int, default=4, help="threads running reports")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # Switch threads often so races show up
+    sys.setswitchinterval(1e-5)
+    result = run(args.members, args.appenders, args.registrars, args.readers, args.seconds, args.seed)
+    print(f"{result['appends']:,} appends, {result['reads']:,} report rounds, {result['saves']} saves, "
+          f"{result['members_now']:,} members at the end")
+    for message in result["failures"]:
+        print("FAIL " + message)
+    print("OK" if not result["failures"] else f"{len(result['failures'])} failures")
+    return 1 if result["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
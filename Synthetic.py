@@ -0,0 +1,60 @@
+import math
+import random
+import sys
+from datetime import date, timedelta
+
+from Logic import GymManager, Member, Payment, WorkoutPlan
+
+FOCUS_AREAS = ["Legs", "Upper-body", "Core", "Cardio", "Full-body", "Mobility"]
+EXERCISES = ["Squat", "Deadlift", "Bench Press", "Row", "Plank", "Lunge",
+             "Pull-up", "Burpee", "Kettlebell Swing", "Rowing Machine"]
+MONTHLY_FEES = [1500.0, 2500.0, 3500.0]
+
+
+def generate_gym(members=1000, plans=10, years=1, visits_per_week=2,
+                 pay_rate=0.85, seed=0, end=None):
+    # Builds a GymManager with `members` members spread over `years` of
+    # history up to `end` (default today). The same arguments always give
+    # the same gym. Date objects are shared between members, as they are
+    # after loading, so large gyms stay affordable to build.
+    rng = random.Random(seed)
+    end = end or date.today()
+    total_days = int(365 * years)
+    start = end - timedelta(days=total_days)
+    days = [start + timedelta(i) for i in range(total_days + 1)]
+    month_starts = [i for i, d in enumerate(days) if d.day == 1]
+
+    manager = GymManager()
+    for p in range(plans):
+        manager.add_workoutplan(WorkoutPlan(
+            f"P{p:03d}", f"Plan {p}", rng.choice(FOCUS_AREAS), rng.sample(EXERCISES, 4)))
+    plan_ids = list(manager.workout_plans)
+
+    visit_rate = min(visits_per_week / 7, 0.999)
+    log_miss = math.log(1.0 - visit_rate)
+    for n in range(members):
+        joined = rng.randrange(total_days + 1)
+        member = Member(f"M{n:06d}", f"Member {n}", rng.randint(16, 70), days[joined])
+        # Jump straight to each visit (geometric gaps) instead of a coin per day
+        visits, i = [], joined - 1
+        while visit_rate > 0:
+            i += 1 + int(math.log(1.0 - rng.random()) / log_miss)
+            if i > total_days:
+                break
+            visits.append(days[i])
+        member.attendance_log = visits
+        fee = rng.choice(MONTHLY_FEES)
+        member.payment_log = [Payment(days[i], fee) for i in month_starts
+                              if i >= joined and rng.random() < pay_rate]
+        manager.register_member(member)
+        if plan_ids and rng.random() < 0.8:
+            manager.assign_workoutplan(rng.choice(plan_ids), member.member_id)
+    return manager
+
+
+if __name__ == "__main__":
+    # python Synthetic.py [members] [out.json]: write a synthetic gym to disk
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    out = sys.argv[2] if len(sys.argv) > 2 else f"synthetic_{size}.json"
+    generate_gym(size).save_to_file(out)
+    print(f"Wrote a {size}-member gym to {out}.")
@@ -0,0 +1,281 @@
+import json
+import os
+import struct
+from datetime import date, timedelta
+
+import pytest
+
+from Logic import (BINARY_MAGIC, BINARY_VERSION, DEFAULT_SHARDS, SHARDED_VERSION, BackgroundSaver,
+                   GymManager, Member, WorkoutPlan, _shard_file, _write_json_snapshot, journal_path,
+                   shard_of)
+from Synthetic import generate_gym
+
+
+def test_batch_with_background_saver_is_saved(tmp_path):
+    path = str(tmp_path / "gym.json")
+    generate_gym(20).save_to_file(path)
+    manager = GymManager()
+    manager.load_from_file(path)
+    manager.open_journal(path)
+    saver = BackgroundSaver(manager, path, delay=5)
+    member_id = next(iter(manager.members))
+    days = [date(2020, 1, 1) + timedelta(i) for i in range(20)]
+    with manager.batch():
+        for day in days:
+            manager.log_attendance(day, member_id)
+    saver.stop()
+    manager.close_journal()
+
+    reloaded = GymManager()
+    reloaded.load_from_file(path)
+    assert set(days) <= set(reloaded.members[member_id].attendance_log)
+
+
+def test_torn_journal_tail_is_cut_before_appending(tmp_path):
+    path = str(tmp_path / "gym.json")
+    generate_gym(20).save_to_file(path)
+    manager = GymManager()
+    manager.load_from_file(path)
+    manager.open_journal(path)
+    member_id = next(iter(manager.members))
+    manager.log_attendance(date(2020, 1, 1), member_id)
+    manager.close_journal()
+    # A crash in the middle of writing the next record
+    with open(journal_path(path), "a") as f:
+        f.write('{"member_id":"M0000')
+
+    restarted = GymManager()
+    restarted.load_from_file(path)
+    restarted.open_journal(path)
+    restarted.log_attendance(date(2020, 1, 2), member_id)
+    restarted.log_attendance(date(2020, 1, 3), member_id)
+    restarted.close_journal()
+    with open(journal_path(path)) as f:
+        assert [json.loads(line)["date"] for line in f] == ["2020-01-01", "2020-01-02", "2020-01-03"]
+
+    reloaded = GymManager()
+    reloaded.load_from_file(path)
+    days = {date(2020, 1, 1), date(2020, 1, 2), date(2020, 1, 3)}
+    assert days <= set(reloaded.members[member_id].attendance_log)
+
+
+def test_load_skips_hand_typed_legacy_dates(tmp_path, capsys):
+    # Older versions let dates be typed in any form
+    path = tmp_path / "gym.json"
+    path.write_text(json.dumps({
+        "workout_plans": [],
+        "members": [{
+            "member_id": "M1", "name": "Ann", "age": 30, "join_date": "2025-01-02",
+            "workout_plan_id": None,
+            "payment_history": [["18/10/2025", 500.0], ["2025-10-19", 300.0]],
+            "attendance_log": ["2025-10-18", "18/10/2025", "yesterday"],
+        }],
+    }))
+    manager = GymManager()
+    manager.load_from_file(str(path))
+    member = manager.members["M1"]
+    assert member.attendance_log == (date(2025, 10, 18),)
+    assert [tuple(payment) for payment in member.payment_log] == [(date(2025, 10, 19), 300.0)]
+    assert "18/10/2025" in capsys.readouterr().err
+
+
+def _dump(manager):
+    return json.dumps(manager.snapshot(), sort_keys=True)
+
+
+def _journaled_gym(tmp_path, members=20, **journal):
+    path = str(tmp_path / "gym.json")
+    generate_gym(members).save_to_file(path)
+    manager = GymManager()
+    manager.load_from_file(path)
+    manager.open_journal(path, **journal)
+    return manager, path
+
+
+def test_journal_replays_every_kind_of_change(tmp_path):
+    manager, path = _journaled_gym(tmp_path)
+    with open(path) as f:
+        snapshot = f.read()
+    first, second = list(manager.members)[:2]
+    manager.add_workoutplan(WorkoutPlan("PX", "Extra", "Core", ["Plank"]))
+    manager.register_member(Member("N1", "New Member", 40, date(2026, 1, 1)))
+    manager.assign_workoutplan("PX", "N1")
+    manager.log_attendance(date(2026, 1, 2), "N1")
+    manager.add_payment(date(2026, 1, 2), 1500.0, "N1")
+    manager.unassign_workoutplan("PX", "N1")
+    manager.assign_workoutplan("PX", first)
+    manager.remove_member(second)
+    manager.close_journal()
+    with open(path) as f:
+        assert f.read() == snapshot   # everything went to the journal
+
+    reloaded = GymManager()
+    reloaded.load_from_file(path)
+    assert _dump(reloaded) == _dump(manager)
+
+
+def test_journal_already_in_the_snapshot_is_not_replayed_twice(tmp_path):
+    # A crash after the snapshot was renamed into place, before the journal
+    # was cut, leaves records the snapshot already holds
+    manager, path = _journaled_gym(tmp_path)
+    member_id = next(iter(manager.members))
+    manager.log_attendance(date(2026, 1, 2), member_id)
+    manager.add_payment(date(2026, 1, 2), 1500.0, member_id)
+    with open(journal_path(path)) as f:
+        journal = f.read()
+    manager.save_to_file(path)
+    manager.close_journal()
+    with open(journal_path(path), "w") as f:
+        f.write(journal)
+
+    reloaded = GymManager()
+    reloaded.load_from_file(path)
+    assert _dump(reloaded) == _dump(manager)
+
+
+def test_journal_is_compacted_into_the_snapshot(tmp_path):
+    manager, path = _journaled_gym(tmp_path, compact_bytes=2000)
+    member_id = next(iter(manager.members))
+    for i in range(100):
+        manager.log_attendance(date(2020, 1, 1) + timedelta(i), member_id)
+    # Each time the journal passed 2000 bytes it was folded into the snapshot
+    assert os.path.getsize(journal_path(path)) < 2000
+    with open(path) as f:
+        assert json.load(f)["journal_seq"] > 0
+    manager.close_journal()
+
+    reloaded = GymManager()
+    reloaded.load_from_file(path)
+    assert _dump(reloaded) == _dump(manager)
+
+
+def test_binary_snapshot_round_trip(tmp_path):
+    manager = generate_gym(50)
+    manager.register_member(Member("N1", "Nobody Yet", 30, date(2026, 1, 1)))   # empty logs
+    path = str(tmp_path / "gym.bin")
+    manager.save_to_file(path)
+    with open(path, "rb") as f:
+        assert f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+    reloaded = GymManager()
+    reloaded.load_from_file(path)   # detected from the magic
+    assert _dump(reloaded) == _dump(manager)
+
+
+def test_binary_snapshot_rejects_other_versions_and_files(tmp_path):
+    path = str(tmp_path / "gym.bin")
+    generate_gym(5).save_to_file(path)
+    with open(path, "r+b") as f:
+        f.seek(len(BINARY_MAGIC))
+        f.write(struct.pack("<H", BINARY_VERSION + 1))
+    with pytest.raises(ValueError, match="version"):
+        GymManager().load_from_file(path)
+
+    json_path = str(tmp_path / "gym.json")
+    generate_gym(5).save_to_file(json_path)
+    with pytest.raises(ValueError, match="not a binary gym snapshot"):
+        GymManager().load_from_file(json_path, format="binary")
+
+
+def test_binary_snapshot_cut_short_is_refused(tmp_path):
+    path = str(tmp_path / "gym.bin")
+    generate_gym(50).save_to_file(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    for cut in (10, 100, len(data) // 2, len(data) - 4):
+        with open(path, "wb") as f:
+            f.write(data[:cut])
+        with pytest.raises(ValueError):
+            GymManager().load_from_file(path)
+
+
+def _sharded_gym(tmp_path, members=100):
+    dirname = str(tmp_path / "gym.shards")
+    generate_gym(members).save_to_file(dirname)
+    manager = GymManager()
+    manager.load_from_file(dirname)
+    manager.open_journal(dirname)
+    return manager, dirname
+
+
+def _shard_times(dirname):
+    return {name: os.stat(os.path.join(dirname, name)).st_mtime_ns
+            for name in os.listdir(dirname) if name.startswith("members-")}
+
+
+def test_sharded_snapshot_round_trip(tmp_path):
+    manager, dirname = _sharded_gym(tmp_path)
+    assert len(_shard_times(dirname)) == DEFAULT_SHARDS
+    reloaded = GymManager()
+    reloaded.load_from_file(dirname)
+    assert _dump(reloaded) == _dump(manager)
+
+
+def test_sharded_save_rewrites_only_changed_shards(tmp_path):
+    manager, dirname = _sharded_gym(tmp_path)
+    member_id = next(iter(manager.members))
+    before = _shard_times(dirname)
+    manager.log_attendance(date(2026, 1, 2), member_id)
+    manager.save_to_file(dirname)
+    after = _shard_times(dirname)
+    changed = [name for name in after if after[name] != before[name]]
+    assert changed == [os.path.basename(_shard_file(dirname, shard_of(member_id, DEFAULT_SHARDS)))]
+    manager.close_journal()
+
+    reloaded = GymManager()
+    reloaded.load_from_file(dirname)
+    assert _dump(reloaded) == _dump(manager)
+
+
+def test_sharded_save_cut_short_recovers_from_the_journal(tmp_path):
+    manager, dirname = _sharded_gym(tmp_path)
+    shards = {}
+    for member_id in manager.members:
+        shards.setdefault(shard_of(member_id, DEFAULT_SHARDS), member_id)
+    (first, saved), (_, unsaved) = list(shards.items())[:2]
+    manager.log_attendance(date(2026, 1, 2), saved)
+    manager.log_attendance(date(2026, 1, 3), unsaved)
+    # A save that crashed after writing one shard, before the manifest, plus
+    # a temp file it was still writing
+    snap = manager.sharded_snapshot(dirname)
+    _write_json_snapshot(_shard_file(dirname, first), [],
+                         (member.to_dict() for member in snap["members"][first]),
+                         snap["journal_seq"], compact=True)
+    with open(_shard_file(dirname, 1) + ".tmp", "w") as f:
+        f.write('{"workout_plans":[],"members":[{"mem')
+    manager.close_journal()
+
+    reloaded = GymManager()
+    reloaded.load_from_file(dirname)
+    # The saved shard's check-in is not replayed a second time
+    assert _dump(reloaded) == _dump(manager)
+
+
+def test_sharded_snapshot_rejects_other_versions(tmp_path):
+    manager, dirname = _sharded_gym(tmp_path, members=10)
+    manager.close_journal()
+    manifest = os.path.join(dirname, "manifest.json")
+    with open(manifest) as f:
+        data = json.load(f)
+    data["version"] = SHARDED_VERSION + 1
+    with open(manifest, "w") as f:
+        json.dump(data, f)
+    with pytest.raises(ValueError, match="version"):
+        GymManager().load_from_file(dirname)
+
+
+def test_bulk_reports_rows_with_numbers_or_nulls(tmp_path):
+    # Rows as a JSON import gives them: any cell can be a number or null
+    manager = generate_gym(5)
+    result = manager.bulk_register([
+        {"member_id": 42, "name": "Numbered", "age": 30, "plan_id": None},
+        {"member_id": None, "name": "No ID", "age": 30},
+        {"member_id": "N2", "name": 7, "age": 30, "join_date": "2026-01-01"},
+        "not a row",
+    ])
+    assert (result["applied"], result["failed"]) == (2, 2)
+    assert [row for row, _ in result["errors"]] == [2, 4]
+    assert manager.members["42"].name == "Numbered"
+    result = manager.bulk_log_attendance([{"member_id": 42, "date": "2026-01-02"},
+                                          {"member_id": None, "date": "2026-01-02"}])
+    assert (result["applied"], result["failed"]) == (1, 1)
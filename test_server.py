@@ -0,0 +1,127 @@
+import asyncio
+import json
+import time
+from datetime import date
+
+from Logic import GymManager, journal_path
+from Server import CheckInServer
+from Synthetic import generate_gym
+
+
+def _open_gym(tmp_path, members=20):
+    path = str(tmp_path / "gym.json")
+    generate_gym(members).save_to_file(path)
+    manager = GymManager()
+    manager.load_from_file(path)
+    manager.open_journal(path)
+    return manager, path
+
+
+def _journal(path):
+    with open(journal_path(path)) as f:
+        return [json.loads(line) for line in f]
+
+
+async def _exchange(host, port, lines):
+    # Sends every line, then QUIT, and returns the reply lines
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write("".join(line + "\n" for line in lines + ["QUIT"]).encode())
+    await writer.drain()
+    replies = []
+    while line := await reader.readline():
+        replies.append(line.decode().rstrip("\n"))
+    writer.close()
+    return replies
+
+
+def test_checkin_and_payment_round_trip(tmp_path):
+    manager, path = _open_gym(tmp_path)
+
+    async def run():
+        server = CheckInServer(manager)
+        host, port = await server.start("127.0.0.1", 0)
+        try:
+            replies = await _exchange(host, port, [
+                "CHECKIN M000001 2026-01-05",
+                "CHECKIN NOPE",
+                "PAY M000002 50 2026-01-06",
+                "PAY M000002 -1",
+                "bogus",
+            ])
+            # Read before stop(), whose final save folds the journal away
+            return replies, _journal(path)
+        finally:
+            await server.stop()
+
+    replies, journal = asyncio.run(run())
+    assert replies[0].startswith("OK ") and "2026-01-05" in replies[0]
+    assert replies[1] == "ERR unknown member NOPE"
+    assert replies[2].startswith("OK ")
+    assert replies[3].startswith("ERR amount must be positive")
+    assert replies[4] == "ERR bad request 'bogus'"
+    records = [{k: v for k, v in r.items() if k != "seq"} for r in journal]
+    assert records == [
+        {"op": "attend", "member_id": "M000001", "date": "2026-01-05"},
+        {"op": "pay", "member_id": "M000002", "date": "2026-01-06", "amount": 50.0},
+    ]
+
+
+def test_busy_when_saturated(tmp_path):
+    manager, path = _open_gym(tmp_path)
+    server = CheckInServer(manager, max_queue=1, max_batch=1, busy_timeout=0.01)
+    apply_batch = server.apply_batch
+    def slow_batch(requests):
+        time.sleep(0.05)
+        return apply_batch(requests)
+    server.apply_batch = slow_batch
+
+    async def run():
+        host, port = await server.start("127.0.0.1", 0)
+        try:
+            replies = await _exchange(host, port, ["CHECKIN M000003 2026-02-01"] * 20)
+            return replies, _journal(path)
+        finally:
+            await server.stop()
+
+    replies, journal = asyncio.run(run())
+    assert len(replies) == 20
+    assert "BUSY" in replies
+    assert all(reply == "BUSY" or reply.startswith("OK ") for reply in replies)
+    # Only what was answered OK reached the journal
+    ok = sum(reply.startswith("OK ") for reply in replies)
+    assert ok >= 1
+    assert [(r["op"], r["member_id"]) for r in journal] == [("attend", "M000003")] * ok
+    # and the final save on stop() kept them
+    reloaded = GymManager()
+    reloaded.load_from_file(path)
+    day = date(2026, 2, 1)
+    assert (reloaded.members["M000003"].attendance_log.count(day)
+            == manager.members["M000003"].attendance_log.count(day))
+
+
+def test_reads_answer_during_a_slow_batch(tmp_path):
+    manager, path = _open_gym(tmp_path)
+    server = CheckInServer(manager)
+    apply_batch = server.apply_batch
+    def slow_batch(requests):
+        with manager.journal_group():
+            time.sleep(0.5)
+            return apply_batch(requests)
+    server.apply_batch = slow_batch
+
+    async def run():
+        host, port = await server.start("127.0.0.1", 0)
+        try:
+            checkin = asyncio.create_task(_exchange(host, port, ["CHECKIN M000004 2026-03-01"]))
+            await asyncio.sleep(0.1)   # the batch is now being applied
+            start = time.monotonic()
+            members = await _exchange(host, port, ["MEMBERS 3"])
+            elapsed = time.monotonic() - start
+            return await checkin, members, elapsed
+        finally:
+            await server.stop()
+
+    checkin, members, elapsed = asyncio.run(run())
+    assert checkin[0].startswith("OK ")
+    assert members == ["OK M000000 M000001 M000002"]
+    assert elapsed < 0.3
@@ -0,0 +1,35 @@
+from datetime import date
+
+from Logic import GymManager, Member
+from Storage import SqliteStorage, migrate_json, open_manager
+from Synthetic import generate_gym
+
+
+def test_search_matches_the_in_memory_order(tmp_path):
+    gym = generate_gym(300)
+    # A lower-case twin of an ID and a name, and a name holding an ID
+    gym.register_member(Member("m000010", "member 10", 20, "2026-01-01"))
+    gym.register_member(Member("Z1", "Ann M000011", 20, "2026-01-01"))
+    gym.save_to_file(str(tmp_path / "gym.json"))
+    memory = GymManager()
+    memory.load_from_file(str(tmp_path / "gym.json"))
+    migrate_json(str(tmp_path / "gym.json"), str(tmp_path / "gym.db"))
+    sqlite = GymManager(storage=SqliteStorage(str(tmp_path / "gym.db")))
+    for query in ("m", "M00001", "m000011", "member 1", "member 10", "1", "ann", "z", "nobody"):
+        for limit in (3, 10, 50):
+            assert ([m.member_id for m in sqlite.search_members(query, limit)]
+                    == [m.member_id for m in memory.search_members(query, limit)]), (query, limit)
+
+
+def test_open_manager_prefers_the_database(tmp_path):
+    data_file, db_file = str(tmp_path / "gym.json"), str(tmp_path / "gym.db")
+    generate_gym(10).save_to_file(data_file)
+    manager = open_manager(data_file, db_file, journal=True)
+    assert manager.storage is None and len(manager.members) == 10
+    manager.log_attendance("2026-01-02", "M000001")
+    manager.close_journal()
+    assert date(2026, 1, 2) in open_manager(data_file, db_file).members["M000001"].attendance_log
+
+    migrate_json(data_file, db_file)
+    manager = open_manager(data_file, db_file)
+    assert isinstance(manager.storage, SqliteStorage) and len(manager.members) == 10
@@ -0,0 +1,16 @@
+import sys
+
+import Stress
+
+
+def test_threads_keep_every_invariant():
+    # A short Stress.py run: check-ins, payments, joins, reports and saves
+    # from several threads at once, with the attendance store and bitmap on
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)   # as Stress.py does, so races show up
+    try:
+        result = Stress.run(members=300, appenders=3, registrars=1, readers=3, seconds=2.0)
+    finally:
+        sys.setswitchinterval(interval)
+    assert result["failures"] == []
+    assert result["appends"] > 0 and result["reads"] > 0